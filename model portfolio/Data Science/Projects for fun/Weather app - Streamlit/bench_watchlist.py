@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the watch list fetch against a local mock of the Open-Meteo forecast API.
+
+The mock answers every request after a fixed latency (standing in for the round trip to the real
+API) with a forecast of the requested shape, and supports the comma separated batch form. Three
+ways of fetching the same watch list are timed, all with caching disabled:
+
+- sequential: one `WeatherClient.forecast` call per city, as the single-city view does
+- async: `fetch_forecasts` with one location per request, `concurrency` requests in flight
+- async batched: `fetch_forecasts` with `batch_size` locations per request
+
+Usage: python bench_watchlist.py [n_cities] [latency_ms]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from watchlist import fetch_forecasts, forecasts_long
+from weather_client import ForecastCache, WeatherClient
+
+
+def mock_forecast(lat, lng, hourly, daily, days):
+    hours = [f"2024-01-{1 + h // 24:02d}T{h % 24:02d}:00" for h in range(24 * days)]
+    dates = [f"2024-01-{1 + d:02d}" for d in range(days)]
+    return {
+        "latitude": lat, "longitude": lng,
+        "current_weather": {"temperature": 10.0, "windspeed": 5.0, "winddirection": 180, "weathercode": 1},
+        "hourly": {"time": hours, **{v: [1.0] * len(hours) for v in hourly.split(",")}},
+        "daily": {"time": dates, **{v: [f"{d}T07:00" if v in ("sunrise", "sunset") else 1.0 for d in dates]
+                                    for v in daily.split(",")}},
+    }
+
+
+def mock_server(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def do_GET(self):
+            q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            time.sleep(latency)
+            points = [mock_forecast(float(a), float(b), q["hourly"], q["daily"], int(q["forecast_days"]))
+                      for a, b in zip(q["latitude"].split(","), q["longitude"].split(","))]
+            body = json.dumps(points if len(points) > 1 else points[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/forecast"
+
+
+def main(n_cities=120, latency=0.05, concurrency=8, batch_size=50):
+    rng = np.random.default_rng(0)
+    locations = list(zip(rng.uniform(-60, 70, n_cities), rng.uniform(-180, 180, n_cities)))
+    server, url = mock_server(latency)
+
+    client = WeatherClient(url, cache=ForecastCache(path=None, max_age=0))
+    t = time.perf_counter()
+    sequential = [client.forecast(lat, lng) for lat, lng in locations]
+    timings = {"sequential": time.perf_counter() - t}
+
+    for name, size in [("async", 1), ("async batched", batch_size)]:
+        t = time.perf_counter()
+        result = fetch_forecasts(locations, cache=ForecastCache(path=None, max_age=0), base_url=url,
+                                 batch_size=size, concurrency=concurrency)
+        timings[name] = time.perf_counter() - t
+        assert [r["latitude"] for r in result] == [r["latitude"] for r in sequential]
+
+    t = time.perf_counter()
+    long = forecasts_long(range(n_cities), sequential)
+    merge = time.perf_counter() - t
+    server.shutdown()
+
+    print(f"{n_cities} cities, {latency * 1000:.0f} ms latency, concurrency {concurrency}, batch size {batch_size}")
+    for name, seconds in timings.items():
+        print(f"{name:>16}: {seconds:7.3f} s  ({timings['sequential'] / seconds:5.1f}x)")
+    print(f"long DataFrame: {len(long):,} rows in {merge:.3f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]), *(float(a) / 1000 for a in sys.argv[2:3]))
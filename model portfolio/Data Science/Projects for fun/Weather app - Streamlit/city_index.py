@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Index over the world cities table for the sidebar.
+
+The table is sorted once by (country, city), so every country is a contiguous block of rows and
+`bounds` maps it to its (start, stop) row range: selecting a country is a slice, and a city within
+it is a binary search over the block's sorted names. Type-ahead search over all cities uses a
+sorted array of lower-cased names; the matches for a prefix are the range between two binary
+searches. The order by population is kept too, for the largest-cities watch list. Repeated
+strings (country, codes, admin names, timezone) are stored as categoricals.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+CATEGORICAL = ["country", "iso2", "iso3", "admin_name", "capital", "timezone"]
+
+
+class CityIndex:
+    def __init__(self, cities):
+        cities = cities.dropna(subset=["country", "city_ascii"])
+        cities = cities.sort_values(["country", "city_ascii"], kind="stable").reset_index(drop=True)
+        for column in CATEGORICAL:
+            if column in cities:
+                cities[column] = cities[column].astype("category")
+        self.cities = cities
+
+        countries = cities["country"].to_numpy(dtype=object)
+        self.countries, starts = np.unique(countries, return_index=True)
+        self.countries = self.countries.tolist()
+        stops = np.append(starts[1:], len(cities))
+        self.bounds = dict(zip(self.countries, zip(starts.tolist(), stops.tolist())))
+
+        self._names = cities["city_ascii"].to_numpy(dtype=object)
+        keys = cities["city_ascii"].str.lower().to_numpy(dtype=str)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+        population = cities["population"].fillna(0).to_numpy() if "population" in cities else np.zeros(len(cities))
+        self._by_population = np.argsort(-population, kind="stable")
+
+    def __len__(self):
+        return len(self.cities)
+
+    def country(self, name):
+        start, stop = self.bounds[name]
+        return self.cities.iloc[start:stop]
+
+    def city_names(self, country):
+        start, stop = self.bounds[country]
+        names = self._names[start:stop]
+        # already sorted: keep the first of each run of equal names
+        keep = np.ones(len(names), dtype=bool)
+        keep[1:] = names[1:] != names[:-1]
+        return names[keep].tolist()
+
+    def city(self, country, name):
+        """First row of `name` in `country`."""
+        start, stop = self.bounds[country]
+        i = start + np.searchsorted(self._names[start:stop], name)
+        if i == stop or self._names[i] != name:
+            raise KeyError(f"{name}, {country}")
+        return self.cities.iloc[i]
+
+    def largest(self, n):
+        return self.cities.iloc[self._by_population[:n]]
+
+    def search(self, prefix, limit=20):
+        """Rows of the cities whose name starts with `prefix` (case-insensitive), at most `limit`."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return self.cities.iloc[:0]
+        lo = np.searchsorted(self._keys, prefix, side="left")
+        hi = np.searchsorted(self._keys, prefix + "\U0010ffff", side="left")
+        return self.cities.iloc[self._order[lo:min(hi, lo + limit)]]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Forecast parsing and a Parquet history of every forecast fetched.
+
+`section_arrays` turns a section of the Open-Meteo JSON ("hourly" or "daily") straight into typed
+NumPy columns: the ISO timestamps are parsed by numpy's datetime64 parser and the variables become
+float64 arrays with NaN for nulls, with no per-element pandas parsing. The JSON itself is decoded
+by orjson in weather_client.py and watchlist.py.
+
+`ForecastStore` appends forecasts to a Parquet dataset per section, hive-partitioned by city and
+issue date. A vintage is the 15-minute update window the forecast was fetched in (the same cadence
+as the `ForecastCache`), and each vintage of a city is one file named after it, so storing the
+same vintage again overwrites it instead of duplicating rows. Times are stored in UTC, with the
+lead time of every row relative to its vintage, so vintages can be compared: `forecast_vs_actual`
+matches every forecast with the value the latest vintage issued at or after its valid time gave
+for that time.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecast_history")
+
+
+def section_arrays(data, section="hourly"):
+    """{"time": datetime64 (local time), variable: float64} for a section of a forecast."""
+    block = data[section]
+    unit = "s" if section == "hourly" else "D"
+    columns = {"time": np.array(block["time"], dtype=f"datetime64[{unit}]")}
+    for variable, values in block.items():
+        if variable == "time":
+            continue
+        if variable in ("sunrise", "sunset"):
+            columns[variable] = np.array(values, dtype="datetime64[s]")
+        else:
+            columns[variable] = np.array(values, dtype=float)  # nulls become NaN
+    return columns
+
+
+def vintage(now, update_interval=15 * 60):
+    return np.datetime64(int(now // update_interval * update_interval), "s")
+
+
+class ForecastStore:
+    def __init__(self, root=HISTORY_PATH, update_interval=15 * 60):
+        self.root = root
+        self.update_interval = update_interval
+
+    def section_table(self, names, forecasts, section, issued):
+        tables = []
+        for name, data in zip(names, forecasts):
+            columns = section_arrays(data, section)
+            # local times to UTC
+            valid = (columns.pop("time").astype("datetime64[s]")
+                     - np.timedelta64(int(data.get("utc_offset_seconds", 0)), "s"))
+            n = len(valid)
+            table = {
+                "city": np.full(n, name, dtype=object),
+                "issue_date": np.full(n, str(issued.astype("datetime64[D]")), dtype=object),
+                "issued": np.full(n, issued),
+                "valid_time": valid,
+                "lead_hours": ((valid - issued) / np.timedelta64(1, "h")).astype(np.float32),
+                "latitude": np.full(n, data["latitude"], dtype=float),
+                "longitude": np.full(n, data["longitude"], dtype=float),
+            }
+            table.update(columns)
+            tables.append(pa.table(table))
+        return pa.concat_tables(tables)
+
+    def append(self, names, forecasts, now=None):
+        """Stores the hourly and daily sections of one forecast per name."""
+        issued = vintage(time.time() if now is None else now, self.update_interval)
+        for section in ("hourly", "daily"):
+            pq.write_to_dataset(
+                self.section_table(names, forecasts, section, issued),
+                os.path.join(self.root, section),
+                partition_cols=["city", "issue_date"],
+                basename_template=f"{str(issued).replace(':', '')}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+
+    def load(self, city=None, section="hourly", columns=None):
+        path = os.path.join(self.root, section)
+        if not os.path.isdir(path):
+            return pd.DataFrame()
+        filters = [("city", "=", city)] if city is not None else None
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+    def vintages(self, city):
+        history = self.load(city, columns=["issued"])
+        return np.sort(history["issued"].unique()) if len(history) else np.array([], dtype="datetime64[s]")
+
+    def forecast_vs_actual(self, city, variable="temperature_2m"):
+        """One row per forecast of `variable` (lead > 0) with the actual value it is compared with."""
+        history = self.load(city, columns=["issued", "valid_time", "lead_hours", variable])
+        if history.empty:
+            return history
+        past = history[history["lead_hours"] <= 0].sort_values("issued")
+        actual = past.drop_duplicates("valid_time", keep="last").set_index("valid_time")[variable]
+        forecasts = history[history["lead_hours"] > 0].rename(columns={variable: "forecast"})
+        forecasts["actual"] = forecasts["valid_time"].map(actual)
+        forecasts = forecasts.dropna(subset=["actual"])
+        forecasts["error"] = forecasts["forecast"] - forecasts["actual"]
+        return forecasts.sort_values(["issued", "valid_time"]).reset_index(drop=True)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Timezone lookups for the weather app.
+
+`TimezoneIndex` wraps timezonefinder, whose timezone polygons ship as prebuilt binary files with
+an H3 hexagon shortcut index; with `in_memory=False` they are memory-mapped instead of parsed, so
+building the index is cheap and it is meant to be built once per process (see
+`get_timezone_index` in weather_app.py). Point lookups are memoised on coordinates rounded to
+about 10 m, so repeated lookups are dictionary hits.
+
+`attach_timezones` labels a whole city table: countries with a single IANA zone take it straight
+from pytz's country table, and only cities in multi-zone countries are looked up, once per
+distinct coordinate.
+"""
+
+from functools import lru_cache
+
+import pandas as pd
+import pytz
+from timezonefinder import TimezoneFinder
+
+
+def utc_offset_zone(lng):
+    # fallback for points outside every polygon: the nautical zone of the longitude
+    offset = round(lng / 15)
+    return "UTC" if offset == 0 else f"Etc/GMT{-offset:+d}"
+
+
+class TimezoneIndex:
+    def __init__(self, in_memory=False, precision=4):
+        self.finder = TimezoneFinder(in_memory=in_memory)
+        self.precision = precision
+        self._lookup = lru_cache(maxsize=200_000)(self._find)
+
+    def _find(self, lat, lng):
+        return self.finder.timezone_at(lng=lng, lat=lat) or utc_offset_zone(lng)
+
+    def timezone_name(self, lat, lng):
+        return self._lookup(round(float(lat), self.precision), round(float(lng), self.precision))
+
+    def timezone(self, lat, lng):
+        return pytz.timezone(self.timezone_name(lat, lng))
+
+
+def attach_timezones(cities, index, lat="lat", lng="lng", iso2="iso2"):
+    """Returns the IANA timezone name of every row of `cities`, as a Series aligned with it."""
+    single_zone = {code: zones[0] for code, zones in pytz.country_timezones.items() if len(zones) == 1}
+    names = cities[iso2].map(single_zone)
+
+    todo = names.isna()
+    coords = cities.loc[todo, [lat, lng]].round(index.precision)
+    unique = coords.drop_duplicates()
+    found = pd.Series([index.timezone_name(a, b) for a, b in zip(unique[lat], unique[lng])],
+                      index=pd.MultiIndex.from_frame(unique))
+    names[todo] = found.reindex(pd.MultiIndex.from_frame(coords)).to_numpy()
+    return names
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Forecasts for a watch list of locations, fetched concurrently.
+
+Open-Meteo accepts comma separated latitudes and longitudes and then answers with a list of
+forecasts, one per location, so the locations not already in the `ForecastCache` are packed into
+batches of `batch_size`. The batches are requested together on one aiohttp session, at most
+`concurrency` at a time (a semaphore, plus a connector limit of the same size), with the same
+retry rule as `WeatherClient`. Each forecast is cached under its own single-location parameters,
+so the watch list and the single-city view share cache entries.
+
+`forecasts_long` merges the results into one long DataFrame (city, time, variable, value) for
+the comparison charts. bench_watchlist.py compares this path with sequential `WeatherClient`
+calls against a local mock server.
+"""
+
+import asyncio
+
+import aiohttp
+import numpy as np
+import orjson
+import pandas as pd
+
+from weather_client import FORECAST_URL, ForecastCache, forecast_params
+
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# fields holding ISO times rather than numbers
+TIME_VARIABLES = ("time", "sunrise", "sunset")
+
+
+def batch_params(params_list):
+    batch = dict(params_list[0])
+    batch['latitude'] = ",".join(str(p['latitude']) for p in params_list)
+    batch['longitude'] = ",".join(str(p['longitude']) for p in params_list)
+    return batch
+
+
+async def get_json(session, semaphore, url, params, retries=3, backoff=0.5):
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUS or attempt == retries:
+                        response.raise_for_status()
+                        try:
+                            return orjson.loads(await response.read())
+                        except orjson.JSONDecodeError as e:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status,
+                                message=f"Invalid JSON: {e}", headers=response.headers) from e
+            except aiohttp.ClientConnectionError:
+                if attempt == retries:
+                    raise
+            await asyncio.sleep(backoff * 2**attempt)
+
+
+async def get_all(url, params_list, concurrency=8, timeout=30, retries=3, backoff=0.5):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(get_json(session, semaphore, url, params, retries, backoff)
+                                      for params in params_list))
+
+
+def fetch_forecasts(locations, cache=None, base_url=FORECAST_URL, batch_size=50, concurrency=8, timeout=30,
+                    retries=3, backoff=0.5, **variables):
+    """
+    Forecast JSON for every (lat, lng) in `locations`, in order. `variables` are passed on to
+    `forecast_params` (hourly, daily, forecast_days). Raises ValueError if a batch response does
+    not hold one forecast per location requested.
+    """
+    cache = ForecastCache(path=None) if cache is None else cache
+    params = [forecast_params(lat, lng, **variables) for lat, lng in locations]
+    keys = [ForecastCache.key(p) for p in params]
+
+    found = {}
+    for key, p in zip(keys, params):
+        if key not in found:
+            found[key] = cache.get(p)
+    missing = [key for key, data in found.items() if data is None]
+    unique = dict(zip(keys, params))
+
+    if missing:
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        responses = asyncio.run(get_all(base_url, [batch_params([unique[k] for k in batch]) for batch in batches],
+                                        concurrency, timeout, retries, backoff))
+        fetched = []
+        for batch, response in zip(batches, responses):
+            # a single location comes back as one object rather than a list
+            response = response if isinstance(response, list) else [response]
+            if len(response) != len(batch):
+                missed = [(unique[k]['latitude'], unique[k]['longitude']) for k in batch[len(response):]]
+                raise ValueError(f"Expected {len(batch)} forecasts in a batch, got {len(response)}; "
+                                 f"no forecast for {missed}")
+            fetched += [(unique[k], data) for k, data in zip(batch, response)]
+            found.update(zip(batch, response))
+        cache.put_many(fetched)
+
+    return [found[key] for key in keys]
+
+
+def forecasts_long(names, forecasts, section="hourly"):
+    """
+    One row per (city, time, variable) of the `section` ("hourly" or "daily") of each forecast,
+    for the numeric variables (sunrise and sunset are times and are left out).
+    """
+    cities, variables, times, values = [], [], [], []
+    for name, data in zip(names, forecasts):
+        block = data[section]
+        for variable, series in block.items():
+            if variable not in TIME_VARIABLES:
+                cities.append(name)
+                variables.append(variable)
+                times.append(block["time"])
+                values.append(np.asarray(series, dtype=float))  # nulls become NaN
+    lengths = [len(v) for v in values]
+    return pd.DataFrame({
+        "city": pd.Categorical(np.repeat(np.array(cities, dtype=object), lengths)),
+        "time": pd.to_datetime(np.concatenate(times)),
+        "variable": pd.Categorical(np.repeat(np.array(variables, dtype=object), lengths)),
+        "value": np.concatenate(values),
+    })
+
+
+def current_table(names, forecasts):
+    return pd.DataFrame([data["current_weather"] for data in forecasts], index=pd.Index(names, name="city"))
@@ -8,6 +8,7 @@ locations worldwide. Features include:
 
 - Current weather conditions (temperature, wind, humidity)
 - Interactive 7-day forecast charts
+- Watch list of many cities fetched concurrently, with comparison charts
 - Location search with autocomplete
 - Responsive map visualization
 - Air quality index (new feature)
@@ -21,18 +22,26 @@ Data Sources:
 
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import requests
 import json
+import asyncio
+import aiohttp
 from datetime import datetime, timedelta
 import pytz
-from tzwhere import tzwhere
 import folium
 from streamlit_folium import folium_static
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from timezones import TimezoneIndex, attach_timezones
+from weather_client import WeatherClient
+from watchlist import current_table, fetch_forecasts, forecasts_long
+from city_index import CityIndex
+from forecast_store import ForecastStore, section_arrays
+
 # App Configuration
 st.set_page_config(
     page_title="Enhanced Weather Forecast",
@@ -46,32 +55,48 @@ st.markdown("""
 Get current weather conditions and detailed 7-day forecasts for locations worldwide.
 """)
 
-# Load city data with caching
-@st.cache_data
-def load_city_data():
-    try:
-        return pd.read_csv("worldcities.csv")
-    except:
-        st.error("City data file not found. Please ensure 'worldcities.csv' is available.")
-        return pd.DataFrame()
+# Timezone index, built once per process (the polygon data is memory-mapped, not parsed)
+@st.cache_resource
+def get_timezone_index():
+    return TimezoneIndex()
+
+CITY_CSV = "worldcities.csv"
+
+# Read the city table with caching, every city labelled with its timezone once (persisted to disk).
+# Keyed on the file's modification time so an updated file is read again; a failed read raises
+# and is therefore not cached.
+@st.cache_data(persist="disk", max_entries=1)
+def read_city_table(path, mtime):
+    cities = pd.read_csv(path)
+    cities["timezone"] = attach_timezones(cities, get_timezone_index())
+    return cities
 
-data = load_city_data()
+# City index (country row ranges, prefix search), built once per process and shared by all sessions
+@st.cache_resource(max_entries=1)
+def load_city_data(path, mtime):
+    return CityIndex(read_city_table(path, mtime))
+
+try:
+    data = load_city_data(CITY_CSV, os.path.getmtime(CITY_CSV))
+except (OSError, ValueError, KeyError) as e:
+    st.error(f"City data could not be loaded from '{CITY_CSV}' ({e}). Please ensure 'worldcities.csv' is available.")
+    st.stop()
 
 # Sidebar for location selection
 with st.sidebar:
     st.header("Location Settings")
     
     # Country selection with search
-    country_set = sorted(set(data["country"]))
+    country_set = data.countries
     selected_country = st.selectbox(
         'Select Country', 
         options=country_set,
-        index=country_set.index('United States') if 'United States' in country_set else 0
+        index=country_set.index('United States') if 'United States' in data.bounds else 0
     )
     
     # City selection with search
-    country_data = data[data["country"] == selected_country]
-    city_set = sorted(set(country_data["city_ascii"]))
+    country_data = data.country(selected_country)
+    city_set = data.city_names(selected_country)
     selected_city = st.selectbox(
         'Select City', 
         options=city_set,
@@ -79,32 +104,44 @@ with st.sidebar:
     )
     
     # Get coordinates
-    city_data = country_data[country_data["city_ascii"] == selected_city].iloc[0]
+    city_data = data.city(selected_country, selected_city)
+
+    # Type-ahead search across all cities, overrides the selection above
+    query = st.text_input('Or search all cities', placeholder='Start typing a city name')
+    matches = data.search(query)
+    if len(matches):
+        labels = (matches["city_ascii"] + ", " + matches["country"].astype(str)).tolist()
+        match = st.selectbox('Matching cities', options=range(len(matches)), format_func=labels.__getitem__)
+        city_data = matches.iloc[match]
+        selected_city, selected_country = city_data["city_ascii"], city_data["country"]
+    elif query:
+        st.caption("No matching city.")
     lat, lng = city_data["lat"], city_data["lng"]
 
-# Function to get timezone
-def get_timezone(lat, lng):
-    tz = tzwhere.tzwhere(forceTZ=True)
-    timezone_str = tz.tzNameAt(lat, lng, forceTZ=True)
-    return pytz.timezone(timezone_str)
+    # Watch list: the largest cities worldwide plus any picked from the selected country
+    st.header("Watch List")
+    n_largest = st.number_input('Largest cities', min_value=0, max_value=500, value=100, step=10)
+    extra_cities = st.multiselect(f'Add cities from {country_data["country"].iat[0]}', options=city_set)
+    watch = pd.concat([
+        data.largest(n_largest),
+        country_data[country_data["city_ascii"].isin(extra_cities)]
+    ]).drop_duplicates(subset=["city_ascii", "country"])
+    watch_names = (watch["city_ascii"] + ", " + watch["country"].astype(str)).tolist()
+
+# Open-Meteo client with a pooled session and a persistent TTL cache, shared by all sessions
+@st.cache_resource
+def get_weather_client():
+    return WeatherClient()
+
+# Parquet history of every forecast shown, one vintage per 15-minute update window
+@st.cache_resource
+def get_forecast_store():
+    return ForecastStore()
 
 # Function to fetch weather data with error handling
 def fetch_weather_data(lat, lng):
-    base_url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        'latitude': lat,
-        'longitude': lng,
-        'current_weather': True,
-        'hourly': 'temperature_2m,precipitation,relativehumidity_2m,cloudcover',
-        'daily': 'temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max',
-        'timezone': 'auto',
-        'forecast_days': 7
-    }
-    
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return get_weather_client().forecast(lat, lng)
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching weather data: {e}")
         return None
@@ -115,8 +152,13 @@ if st.button("Get Weather Forecast"):
         weather_data = fetch_weather_data(lat, lng)
         
         if weather_data:
+            city_key = f"{selected_city}, {selected_country}"
+            get_forecast_store().append([city_key], [weather_data])
+
             # Current weather section
             st.header(f"Current Weather in {selected_city}, {selected_country}")
+            local_tz = pytz.timezone(city_data["timezone"])
+            st.caption(f"Local time: {datetime.now(local_tz):%Y-%m-%d %H:%M} ({local_tz.zone})")
             
             current = weather_data["current_weather"]
             col1, col2, col3, col4 = st.columns(4)
@@ -134,9 +176,9 @@ if st.button("Get Weather Forecast"):
             st.header("7-Day Forecast")
             
             # Process daily data
-            daily = weather_data["daily"]
+            daily = section_arrays(weather_data, "daily")
             daily_df = pd.DataFrame({
-                'Date': pd.to_datetime(daily['time']),
+                'Date': daily['time'],
                 'Max Temp': daily['temperature_2m_max'],
                 'Min Temp': daily['temperature_2m_min'],
                 'Sunrise': daily['sunrise'],
@@ -201,9 +243,9 @@ if st.button("Get Weather Forecast"):
             # Hourly forecast section
             st.header("Hourly Forecast")
             
-            hourly = weather_data["hourly"]
+            hourly = section_arrays(weather_data, "hourly")
             hourly_df = pd.DataFrame({
-                'Time': pd.to_datetime(hourly['time']),
+                'Time': hourly['time'],
                 'Temperature': hourly['temperature_2m'],
                 'Precipitation': hourly['precipitation'],
                 'Humidity': hourly['relativehumidity_2m'],
@@ -240,6 +282,21 @@ if st.button("Get Weather Forecast"):
             )
             
             st.plotly_chart(fig_hourly, use_container_width=True)
+
+            # Forecast history: how earlier forecasts for this city compare with what came after
+            errors = get_forecast_store().forecast_vs_actual(city_key, "temperature_2m")
+            if len(errors):
+                st.header("Forecast Accuracy")
+                by_lead = errors.groupby((errors["lead_hours"] // 24).astype(int) + 1)["error"].agg(
+                    lambda e: e.abs().mean())
+                fig_error = go.Figure(go.Bar(x=by_lead.index, y=by_lead.values, marker_color='gray'))
+                fig_error.update_layout(
+                    title='Mean Absolute Temperature Error by Forecast Day',
+                    xaxis_title='Lead (days)',
+                    yaxis_title='Error (°C)'
+                )
+                st.plotly_chart(fig_error, use_container_width=True)
+                st.caption(f"{errors['issued'].nunique()} stored forecasts, {len(errors):,} hourly comparisons")
             
             # Map section
             st.header("Location Map")
@@ -262,6 +319,49 @@ if st.button("Get Weather Forecast"):
             # Display map
             folium_static(m, height=500)
 
+# Watch list: all cities fetched concurrently, compared side by side
+if st.button(f"Get Watch List Forecasts ({len(watch)} cities)"):
+    with st.spinner('Fetching watch list forecasts...'):
+        try:
+            client = get_weather_client()
+            forecasts = fetch_forecasts(zip(watch["lat"], watch["lng"]), cache=client.cache, base_url=client.base_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            st.error(f"Error fetching weather data: {e}")
+            forecasts = None
+
+    if forecasts:
+        get_forecast_store().append(watch_names, forecasts)
+        st.header("Watch List")
+        st.dataframe(current_table(watch_names, forecasts))
+
+        hourly_long = forecasts_long(watch_names, forecasts, "hourly")
+        temperature = hourly_long[hourly_long["variable"] == "temperature_2m"]
+        fig_watch = go.Figure()
+        for city, series in temperature.groupby("city", observed=True):
+            fig_watch.add_trace(go.Scatter(x=series["time"], y=series["value"], name=city, mode="lines"))
+        fig_watch.update_layout(
+            title='Hourly Temperature by City',
+            xaxis_title='Time',
+            yaxis_title='Temperature (°C)'
+        )
+        st.plotly_chart(fig_watch, use_container_width=True)
+
+        daily_long = forecasts_long(watch_names, forecasts, "daily")
+        daily_max = daily_long[daily_long["variable"] == "temperature_2m_max"].pivot_table(
+            index="city", columns="time", values="value", observed=True)
+        fig_daily = go.Figure(go.Heatmap(
+            z=daily_max.to_numpy(),
+            x=daily_max.columns,
+            y=daily_max.index.astype(str),
+            colorscale="RdBu_r",
+            colorbar=dict(title="°C")
+        ))
+        fig_daily.update_layout(
+            title='Daily Max Temperature by City',
+            height=max(400, 18 * len(daily_max))
+        )
+        st.plotly_chart(fig_daily, use_container_width=True)
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Open-Meteo client for the weather app.
+
+`WeatherClient` keeps one `requests.Session`, so connections to the API are pooled and kept
+alive between button presses, and mounts an adapter that retries connection errors and 429/5xx
+responses with exponential backoff.
+
+Responses go through `ForecastCache`, keyed on the request parameters with the coordinates
+rounded to 0.01 deg (about 1 km, finer than the forecast models' grids). Open-Meteo refreshes its
+current conditions every 15 minutes, so by default an entry expires at the next quarter hour
+rather than a fixed time after it was fetched: everything fetched within one update window is
+served from the cache and nothing outlives it. Entries are held in a SQLite file, so the cache
+survives restarts of the app, and the most recently used `max_entries` of them also in memory.
+Bodies are decoded and stored (as BLOBs) with orjson.
+
+`base_url` can point the client at any server speaking the same API, e.g. a local stub.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+HOURLY = "temperature_2m,precipitation,relativehumidity_2m,cloudcover"
+DAILY = "temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max"
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_cache.sqlite")
+
+
+def forecast_params(lat, lng, hourly=HOURLY, daily=DAILY, forecast_days=7, precision=2):
+    return {
+        'latitude': round(float(lat), precision),
+        'longitude': round(float(lng), precision),
+        'current_weather': 'true',
+        'hourly': hourly,
+        'daily': daily,
+        'timezone': 'auto',
+        'forecast_days': int(forecast_days)
+    }
+
+
+class ForecastCache:
+    """Responses by request parameters, in memory and in SQLite, expiring at update boundaries."""
+
+    def __init__(self, path=CACHE_PATH, update_interval=15 * 60, max_age=None, max_entries=512):
+        self.update_interval = update_interval
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # key -> (expires, data), least recently used first
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS forecasts "
+                             "(key TEXT PRIMARY KEY, fetched REAL, expires REAL, body BLOB)")
+            self._db.commit()
+
+    @staticmethod
+    def key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def expiry(self, now):
+        expires = (now // self.update_interval + 1) * self.update_interval
+        return expires if self.max_age is None else min(expires, now + self.max_age)
+
+    def _remember(self, key, hit):
+        # called with the lock held
+        self._memory[key] = hit
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, params, now=None):
+        now = time.time() if now is None else now
+        key = self.key(params)
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is None and self._db is not None:
+                row = self._db.execute("SELECT expires, body FROM forecasts WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    hit = (row[0], orjson.loads(row[1]))
+            if hit is None or hit[0] <= now:
+                self._memory.pop(key, None)
+                return None
+            self._remember(key, hit)
+        return hit[1]
+
+    def put(self, params, data, now=None):
+        self.put_many([(params, data)], now)
+
+    def put_many(self, items, now=None):
+        # one SQLite transaction for a whole batch of (params, data) pairs
+        now = time.time() if now is None else now
+        expires = self.expiry(now)
+        entries = [(self.key(params), data) for params, data in items]
+        rows = [(key, now, expires, orjson.dumps(data)) for key, data in entries] if self._db is not None else []
+        with self._lock:
+            for key in [key for key, hit in self._memory.items() if hit[0] <= now]:
+                del self._memory[key]
+            for key, data in entries:
+                self._remember(key, (expires, data))
+            if self._db is not None:
+                self._db.execute("DELETE FROM forecasts WHERE expires <= ?", (now,))
+                self._db.executemany("INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM forecasts")
+                self._db.commit()
+
+
+class WeatherClient:
+    def __init__(self, base_url=FORECAST_URL, cache=None, retries=3, backoff=0.5, timeout=10, pool_size=10):
+        self.base_url = base_url
+        self.cache = ForecastCache() if cache is None else cache
+        self.timeout = timeout
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def forecast(self, lat, lng, hourly=HOURLY, daily=DAILY, forecast_days=7):
+        """Forecast JSON for a location, from the cache when it is still current."""
+        params = forecast_params(lat, lng, hourly, daily, forecast_days)
+        data = self.cache.get(params)
+        if data is None:
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            try:
+                data = orjson.loads(response.content)
+            except orjson.JSONDecodeError as e:
+                # e.g. a proxy's error page served with status 200
+                raise requests.exceptions.InvalidJSONError(f"Invalid JSON from the forecast server: {e}",
+                                                           response=response) from e
+            self.cache.put(params, data)
+        return data
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,44 @@
+"""
+Static arbitrage checks for SVI surfaces, on a whole (T, k) meshgrid at once.
+
+- Butterfly: Durrleman's condition on every slice,
+      g(k) = (1 - k*w'/(2*w))**2 - w'**2/4 * (1/w + 1/4) + w''/2 >= 0
+  with the k-derivatives of raw-SVI in closed form.
+- Calendar: total variance w(k, T) must not decrease in T at any fixed k.
+"""
+import numpy as np
+
+from svi_calibration import svi
+
+
+def svi_derivatives(K, params):
+    # w, dw/dk and d2w/dk2 of raw-SVI, parameters broadcast like in svi()
+    a, b, rho, m, sigma = params
+    x = K - m
+    root = np.sqrt(x*x + sigma*sigma)
+    w = svi(K, params)
+    w1 = b*(rho + x/root)
+    w2 = b*sigma*sigma / (root*root*root)
+    return w, w1, w2
+
+
+def durrleman_g(K, w, w1, w2):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (1 - K*w1/(2*w))**2 - w1*w1/4*(1/w + 0.25) + w2/2
+
+
+def calendar_violations(W, tol=1e-10):
+    # W has maturities on axis 0; flags both ends of every step where total variance decreases
+    drop = np.diff(W, axis=0) < -tol
+    bad = np.zeros(W.shape, dtype=bool)
+    bad[1:] |= drop
+    bad[:-1] |= drop
+    return bad
+
+
+def check_surface(K, params, tol=1e-10):
+    """Returns boolean masks (butterfly, calendar) of the meshgrid cells that violate static arbitrage."""
+    w, w1, w2 = (np.broadcast_to(v, np.shape(K)) for v in svi_derivatives(K, params))
+    # a negative density, or a total variance that is not positive
+    butterfly = (durrleman_g(K, w, w1, w2) < -tol) | (w <= 0)
+    return butterfly, calendar_violations(w, tol)
@@ -1,7 +1,13 @@
+import threading
+import time
+from collections import OrderedDict
+
 import streamlit as st
 import numpy as np
 from scipy.stats import norm
 
+run_start = time.perf_counter()
+
 # --- Page Config ---
 st.set_page_config(
     page_title="Black-Scholes Option Sketch",
@@ -44,17 +50,59 @@ r = st.sidebar.number_input("Risk-Free Rate (r)", value=0.01, step=0.001)
 sigma = st.sidebar.number_input("Volatility (σ)", value=0.2, step=0.01)
 
 # --- Pricing Function ---
-def black_scholes_price(S, K, T, r, sigma, option_type="call"):
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    if option_type == "call":
-        return S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2), d1, d2
-    else:
-        return K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1), d1, d2
+def black_scholes_prices(S, K, T, r, sigma):
+    # works on scalars or whole arrays: d1/d2 and the CDFs are computed once for both calls and puts
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    N_d1, N_d2 = norm.cdf(d1), norm.cdf(d2)
+    K_df = K * np.exp(-r * T)
+    call = S * N_d1 - K_df * N_d2
+    put = K_df * (1.0 - N_d2) - S * (1.0 - N_d1)
+    return call, put, d1, d2
+
+# --- Cache ---
+ROUND_DIGITS = 6
+
+class LRUCache:
+    # bounded least-recently-used cache with hit/miss counters, shared across reruns and sessions
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key], True
+        value = compute()
+        with self.lock:
+            self.data[key] = value
+            self.misses += 1
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value, False
+
+@st.cache_resource
+def get_cache(name, maxsize):
+    return LRUCache(maxsize)
+
+def rounded_key(*values):
+    return tuple(round(float(v), ROUND_DIGITS) for v in values)
+
+price_cache = get_cache("prices", 256)
+grid_cache = get_cache("scenario grids", 8)
 
 # --- Compute Prices ---
-call_price, d1, d2 = black_scholes_price(S, K, T, r, sigma, "call")
-put_price, _, _   = black_scholes_price(S, K, T, r, sigma, "put")
+compute_start = time.perf_counter()
+(call_price, put_price, d1, d2), price_hit = price_cache.get_or_compute(
+    rounded_key(S, K, T, r, sigma), lambda: black_scholes_prices(S, K, T, r, sigma)
+)
+price_ms = (time.perf_counter() - compute_start) * 1000
 
 # --- Results Display ---
 st.subheader("🎯 Results")
@@ -69,3 +117,85 @@ d_1 = \frac{\ln(\frac{S_0}{K}) + (r + \frac{1}{2} \sigma^2) T}{\sigma \sqrt{T}},
 d_2 = d_1 - \sigma \sqrt{T}
 """)
 st.markdown(f"d₁ = `{d1:.4f}`  d₂ = `{d2:.4f}`")
+
+# --- Scenario Grid ---
+st.sidebar.header("🗺️ Scenario Grid")
+show_scenarios = st.sidebar.checkbox("Show scenario heatmap", value=False)
+
+def heatmap_rgb(Z, diverging):
+    # map values to an RGB image in one vectorized pass, no plotting library needed
+    if diverging:
+        # red for losses, white around zero, green for gains
+        scale = np.nanmax(np.abs(Z)) or 1.0
+        t = (Z / scale + 1.0) / 2.0
+        stops = np.array([[178, 34, 34], [248, 245, 240], [34, 120, 60]], dtype=float)
+    else:
+        lo, hi = np.nanmin(Z), np.nanmax(Z)
+        t = (Z - lo) / ((hi - lo) or 1.0)
+        stops = np.array([[248, 245, 240], [120, 140, 180], [30, 40, 90]], dtype=float)
+    x = np.linspace(0.0, 1.0, len(stops))
+    rgb = np.stack([np.interp(t, x, stops[:, c]) for c in range(3)], axis=-1)
+    return rgb.astype(np.uint8)
+
+def scenario_grids(S, K, T, r, sigma, axes, resolution, spot_range, vol_low, vol_high):
+    spots = S * np.linspace(1 - spot_range / 100, 1 + spot_range / 100, resolution)
+    if axes == "Spot × Volatility":
+        y_values = np.linspace(vol_low, vol_high, resolution)
+        S_grid, sigma_grid = np.meshgrid(spots, y_values)
+        T_grid = T
+    else:
+        y_values = np.linspace(T / resolution, T, resolution)
+        S_grid, T_grid = np.meshgrid(spots, y_values)
+        sigma_grid = sigma
+
+    # the whole grid in one vectorized pass
+    call_grid, put_grid, _, _ = black_scholes_prices(S_grid, K, T_grid, r, sigma_grid)
+    parity_error = np.max(np.abs(call_grid - put_grid - (S_grid - K * np.exp(-r * T_grid))))
+    return spots, y_values, call_grid, put_grid, parity_error
+
+# only this part reruns when a scenario control changes
+@st.fragment
+def scenario_section(S, K, T, r, sigma, call_price, put_price):
+    st.subheader("🗺️ Scenarios")
+    col1, col2, col3 = st.columns(3)
+    axes = col1.radio("Axes", ["Spot × Volatility", "Spot × Time"])
+    option_side = col2.radio("Option", ["Call", "Put"])
+    metric = col3.radio("Show", ["P&L", "Price"])
+    resolution = st.select_slider("Grid points per axis", options=[100, 250, 500, 1000], value=1000)
+    spot_range = st.slider("Spot range (% of S₀)", 10, 100, 30)
+    vol_low, vol_high = st.slider("Volatility range", 0.01, 1.50, (max(0.01, sigma / 2), sigma * 2),
+                                  disabled=(axes != "Spot × Volatility"))
+
+    grid_start = time.perf_counter()
+    key = rounded_key(S, K, T, r, sigma, resolution, spot_range, vol_low, vol_high) + (axes,)
+    (spots, y_values, call_grid, put_grid, parity_error), grid_hit = grid_cache.get_or_compute(
+        key, lambda: scenario_grids(S, K, T, r, sigma, axes, resolution, spot_range, vol_low, vol_high)
+    )
+    grid_ms = (time.perf_counter() - grid_start) * 1000
+    y_label = "σ" if axes == "Spot × Volatility" else "T"
+
+    values = call_grid if option_side == "Call" else put_grid
+    if metric == "P&L":
+        values = values - (call_price if option_side == "Call" else put_price)
+
+    # first row of the image is the highest y value
+    st.image(heatmap_rgb(values[::-1], diverging=(metric == "P&L")), width="stretch")
+    st.caption(
+        f"{option_side} {metric} · x: S from {spots[0]:.2f} to {spots[-1]:.2f} · y: {y_label} from "
+        f"{y_values[-1]:.4g} (top) to {y_values[0]:.4g} (bottom) · {values.size:,} cells · "
+        f"{metric} range [{values.min():.4f}, {values.max():.4f}] · max put-call parity error {parity_error:.2e}"
+    )
+    st.caption(f"⏱️ Scenario grid: {'cache hit' if grid_hit else 'computed'} in {grid_ms:.1f} ms "
+               f"({grid_cache.hits} hits / {grid_cache.misses} misses)")
+
+if show_scenarios:
+    scenario_section(S, K, T, r, sigma, call_price, put_price)
+
+# --- Timing Panel ---
+with st.sidebar.expander("⏱️ Performance"):
+    st.markdown(f"""
+- **Pricing**: {'cache hit' if price_hit else 'computed'} in {price_ms:.3f} ms
+- **Pricing cache**: {price_cache.hits} hits / {price_cache.misses} misses, {len(price_cache.data)}/{price_cache.maxsize} entries
+- **Scenario cache**: {len(grid_cache.data)}/{grid_cache.maxsize} grids
+- **Rerun**: {(time.perf_counter() - run_start) * 1000:.1f} ms
+""")
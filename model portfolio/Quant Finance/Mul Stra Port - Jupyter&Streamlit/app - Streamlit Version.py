@@ -1,15 +1,26 @@
-import yfinance as yf
+import functools
+import os
+import time
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import plotly.express as px
-from scipy.optimize import minimize
+import plotly.graph_objects as go
 import seaborn as sns
 import streamlit as st
+
+from backtest import walk_forward
+from covariance import estimate_covariance
+from evaluation import evaluate_weights
+from frontier import efficient_frontier
+from montecarlo import risk_report, simulate_wealth
+from optimizers import as_cov, gmv_weights, max_sharpe_weights, risk_parity_weights
+from price_store import PriceStore
+
 st.set_page_config(layout="wide")
 
 sns.set(style="whitegrid")
-np.random.seed(42)
 
 # ---- Setup ----
 tickers = st.sidebar.text_area("Enter tickers (separated by commas or newline):", "AAPL, WMT, TSLA, KO, BAC, T, META, NFLX, CRM")
@@ -18,74 +29,145 @@ start_date = st.sidebar.date_input("Start Date", pd.to_datetime('2020-01-01'))
 end_date = st.sidebar.date_input("End Date", pd.to_datetime('2022-01-01'))
 
 
-prices = yf.download(tickers, start=start_date, end=end_date)['Close']
-returns = prices.pct_change().dropna()
-mean_returns = returns.mean() * 252
-cov_matrix = returns.cov() * 252
-n = len(tickers)
+# Prices come from an on-disk Parquet cache, only date ranges not seen before are downloaded.
+# Set PRICE_FIXTURES to a directory with the same layout to run offline.
+@st.cache_resource
+def get_price_store():
+    if os.environ.get("PRICE_FIXTURES"):
+        return PriceStore(os.environ["PRICE_FIXTURES"], offline=True)
+    return PriceStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_cache"))
+
+
+# ---- Pipeline stages ----
+# prices(tickers, dates) -> returns -> estimates -> weights -> metrics, each cached with
+# st.cache_data on its true inputs (DataFrames are hashed by content), so a rerun only recomputes
+# the stages downstream of what changed. Every call is logged for the debug panel.
+stage_log = []
+
+def stage(func):
+    computed = {}
+
+    @functools.wraps(func)
+    def body(*args):
+        computed["miss"] = True
+        return func(*args)
+
+    cached = st.cache_data(show_spinner=False)(body)
+
+    @functools.wraps(func)
+    def run(*args):
+        computed["miss"] = False
+        depth = len(stage_log)
+        stage_log.append(None)
+        start = time.perf_counter()
+        result = cached(*args)
+        stage_log[depth] = (func.__name__, "miss" if computed["miss"] else "hit", (time.perf_counter() - start) * 1e3)
+        return result
+    return run
+
+@stage
+def load_prices(tickers, start_date, end_date):
+    return get_price_store().get_prices(list(tickers), start_date, end_date)
+
+@stage
+def compute_returns(prices):
+    return prices.pct_change().dropna()
+
+@stage
+def compute_estimates(returns, cov_method, cov_params):
+    # the factor models keep the covariance as B F B' + diag(D), never n x n
+    return returns.mean() * 252, estimate_covariance(returns, cov_method, **dict(cov_params))
+
 
 # ---- Portfolio Optimizers ----
 
-def get_equal_weights():
+def get_equal_weights(n):
     return np.repeat(1/n, n)
 
-def get_inv_vol_weights():
-    vol = returns.std()
+def get_inv_vol_weights(cov_matrix):
+    vol = np.sqrt(as_cov(cov_matrix).diagonal())
     inv_vol = 1 / vol
-    return (inv_vol / inv_vol.sum()).values
-
-def get_gmv_weights():
-    def objective(w): return w.T @ cov_matrix @ w
-    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
-    bounds = [(0, 1)] * n
-    res = minimize(objective, np.repeat(1/n, n), bounds=bounds, constraints=constraints)
-    return res.x
-
-def get_markowitz_weights():
-    def objective(w): return -((w @ mean_returns) / np.sqrt(w.T @ cov_matrix @ w))
-    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
-    bounds = [(0, 1)] * n
-    res = minimize(objective, np.repeat(1/n, n), bounds=bounds, constraints=constraints)
-    return res.x
-
-def get_risk_parity_weights():
-    def risk_contrib(w): return w * (cov_matrix @ w)
-    def objective(w):
-        rc = risk_contrib(w)
-        return np.sum((rc - rc.mean()) ** 2)
-    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
-    bounds = [(0, 1)] * n
-    res = minimize(objective, np.repeat(1/n, n), bounds=bounds, constraints=constraints)
-    return res.x
+    return inv_vol / inv_vol.sum()
+
+# long-only, fully invested; see optimizers.py for the solvers
+def get_gmv_weights(cov_matrix):
+    return gmv_weights(cov_matrix)
+
+def get_markowitz_weights(mean_returns, cov_matrix):
+    return max_sharpe_weights(mean_returns.to_numpy(), cov_matrix)
+
+def get_risk_parity_weights(cov_matrix):
+    return risk_parity_weights(cov_matrix)
+
+@stage
+def compute_weights(returns, cov_method, cov_params):
+    mean_returns, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+    return {
+        "Markowitz": get_markowitz_weights(mean_returns, cov_matrix),
+        "Global Min Var": get_gmv_weights(cov_matrix),
+        "Equal Weighted": get_equal_weights(returns.shape[1]),
+        "Inverse Volatility": get_inv_vol_weights(cov_matrix),
+        "Vanilla Risk Parity": get_risk_parity_weights(cov_matrix)
+    }
 
 
 # ---- Run Evaluations ----
 
-weights = {
-    "Markowitz": get_markowitz_weights(),
-    "Global Min Var": get_gmv_weights(),
-    "Equal Weighted": get_equal_weights(),
-    "Inverse Volatility": get_inv_vol_weights(),
-    "Vanilla Risk Parity": get_risk_parity_weights()
-}
+def evaluate_portfolios(returns, cov_matrix, weights_dict):
+    # all strategies in one pass over an (assets x strategies) weight matrix, see evaluation.py
+    W = np.column_stack(list(weights_dict.values()))
+    return evaluate_weights(returns, W, cov_matrix, names=weights_dict.keys())
+
+@stage
+def compute_metrics(returns, cov_method, cov_params):
+    _, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+    weights = compute_weights(returns, cov_method, cov_params)
+    cr, dd, rc, stats = evaluate_portfolios(returns, cov_matrix, weights)
+    df_w = pd.DataFrame(weights, index=returns.columns).T.reset_index().melt(id_vars='index', var_name='Ticker', value_name='Weight').rename(columns={'index': 'Portfolio'})
+    df_rc = rc.T.reset_index().melt(id_vars='index', var_name='Ticker', value_name='Risk Contribution').rename(columns={'index': 'Portfolio'})
+    return cr, dd, rc, stats, df_w, df_rc
+
+@stage
+def compute_frontier(returns, cov_method, cov_params, n_points, long_only, n_workers):
+    mean_returns, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+    return efficient_frontier(mean_returns, cov_matrix, n_points, long_only, n_workers)
 
-def evaluate_portfolios(weights_dict):
-    cr, dd, rc = {}, {}, {}
+@stage
+def run_simulation(returns, cov_method, cov_params, n_paths, horizon, seed, rebalance_daily, n_workers):
+    mean_returns, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+    weights = compute_weights(returns, cov_method, cov_params)
+    wealth = simulate_wealth(mean_returns, cov_matrix, np.column_stack(list(weights.values())),
+                             n_paths, horizon, seed, rebalance_daily, n_workers)
+    # the distributions are binned here, so the chart does not ship every path to the browser
+    edges = np.linspace(wealth.min(), wealth.max(), 201)
+    density = pd.DataFrame({name: np.histogram(wealth[:, j], edges, density=True)[0] for j, name in enumerate(weights)},
+                           index=(edges[1:] + edges[:-1]) / 2)
+    return risk_report(wealth, weights.keys()), density
 
-    for name, w in weights_dict.items():
-        port_ret = returns @ w
-        cum_ret = (1 + port_ret).cumprod()
-        drawdown = (cum_ret.cummax() - cum_ret) / cum_ret.cummax()
-        risk_contrib = w * (cov_matrix @ w)
-        risk_contrib /= risk_contrib.sum()
-        cr[name], dd[name], rc[name] = cum_ret, drawdown, risk_contrib
+@stage
+def run_backtest(returns, window, rebalance, expanding, n_workers):
+    return walk_forward(returns, window, rebalance, expanding, n_workers=n_workers)
 
-    return pd.DataFrame(cr), pd.DataFrame(dd), pd.DataFrame(rc)
 
-# Evaluate all
-cr, dd, rc = evaluate_portfolios(weights)
-df_w = pd.DataFrame(weights, index=tickers).T.reset_index().melt(id_vars='index', var_name='Ticker', value_name='Weight').rename(columns={'index': 'Portfolio'})
-df_rc = rc.T.reset_index().melt(id_vars='index', var_name='Ticker', value_name='Risk Contribution').rename(columns={'index': 'Portfolio'})
+prices = load_prices(tuple(tickers), start_date, end_date)
+returns = compute_returns(prices)
+
+cov_method = st.sidebar.selectbox("Covariance estimator", ["Sample", "Ledoit-Wolf", "EWMA", "PCA factor", "Fama-French factor"])
+cov_params = {}
+if cov_method == "EWMA":
+    cov_params["halflife"] = st.sidebar.slider("EWMA half-life (days)", 5, 252, 60, 5)
+elif cov_method == "PCA factor":
+    cov_params["k"] = st.sidebar.slider("Number of PCA factors", 1, 20, 5, 1)
+cov_params = tuple(cov_params.items())
+try:
+    mean_returns, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+except ValueError as e:
+    st.sidebar.warning(f"{cov_method} not available, {e}. Using the sample covariance.")
+    cov_method, cov_params = "Sample", ()
+    mean_returns, cov_matrix = compute_estimates(returns, cov_method, cov_params)
+
+weights = compute_weights(returns, cov_method, cov_params)
+cr, dd, rc, stats, df_w, df_rc = compute_metrics(returns, cov_method, cov_params)
 
 # ---- Streamlit App ----
 st.title("Multi-Strategy Portfolio Construction and Risk Analysis")
@@ -104,9 +186,13 @@ from {start_date} to {end_date}.
 st.sidebar.markdown("""
 ## Jump to:
 - [Asset Weights](#asset-weights-by-portfolio)
+- [Performance Metrics](#performance-metrics)
 - [Cumulative Returns](#cumulative-returns-over-time)
 - [Drawdowns](#portfolio-drawdowns)
 - [Risk Contributions](#risk-contributions-by-portfolio)
+- [Efficient Frontier](#efficient-frontier)
+- [Walk-forward Backtest](#walk-forward-backtest-out-of-sample)
+- [Monte Carlo Risk](#monte-carlo-risk)
 """, unsafe_allow_html=True)
 
 
@@ -116,6 +202,13 @@ fig = px.bar(df_w, x="Ticker", y="Weight", color="Portfolio", barmode="group")
 fig.update_layout(xaxis_tickangle=45)
 st.plotly_chart(fig, use_container_width=True)
 
+# --- Performance Metrics ---
+st.markdown("#### Performance Metrics", unsafe_allow_html=True)
+st.dataframe(stats.style.format({
+    "Annual Return": "{:.2%}", "Annual Volatility": "{:.2%}", "Sharpe": "{:.2f}", "Sortino": "{:.2f}",
+    "Calmar": "{:.2f}", "Max Drawdown": "{:.2%}", "Max Drawdown Duration (days)": "{:.0f}",
+}), use_container_width=True)
+
 # --- 2. Cumulative Returns ---
 st.markdown("#### Cumulative Returns Over Time", unsafe_allow_html=True)
 fig = px.line(cr,
@@ -135,6 +228,70 @@ fig = px.bar(df_rc, x="Ticker", y="Risk Contribution", color="Portfolio", barmod
 fig.update_layout(xaxis_tickangle=45)
 st.plotly_chart(fig, use_container_width=True)
 
+# --- 5. Efficient Frontier ---
+st.markdown("#### Efficient Frontier", unsafe_allow_html=True)
+
+col1, col2, col3 = st.columns(3)
+n_points = col1.slider("Frontier points", 100, 500, 200, 50)
+allow_short = col2.checkbox("Allow short selling", value=False)
+frontier_workers = col3.number_input("Worker processes", 1, max(os.cpu_count() or 1, 1), 1, key="frontier_workers")
+frontier, _ = compute_frontier(returns, cov_method, cov_params, n_points, not allow_short, frontier_workers)
+
+fig = go.Figure(go.Scatter(x=frontier["Volatility"], y=frontier["Return"], mode="lines", name="Efficient frontier",
+                           customdata=frontier["Sharpe"], hovertemplate="Vol %{x:.2%}<br>Return %{y:.2%}<br>Sharpe %{customdata:.2f}"))
+for name, w in weights.items():
+    fig.add_trace(go.Scatter(x=[np.sqrt(w @ cov_matrix @ w)], y=[w @ mean_returns], mode="markers", name=name,
+                             marker=dict(size=12)))
+fig.update_layout(xaxis_title="Volatility (annualised)", yaxis_title="Return (annualised)",
+                  xaxis_tickformat=".0%", yaxis_tickformat=".0%")
+st.plotly_chart(fig, use_container_width=True)
+
+# --- 6. Walk-forward Backtest ---
+st.markdown("#### Walk-forward Backtest (Out of Sample)", unsafe_allow_html=True)
+st.write("""
+The charts above use weights fitted on the whole period. Here every strategy is re-fitted on a
+trailing (or expanding) window at each rebalance date and held until the next one.
+""")
+col1, col2, col3, col4 = st.columns(4)
+window = col1.number_input("Estimation window (days)", 21, 2520, 252, 21)
+rebalance = col2.number_input("Rebalance every (days)", 1, 252, 21, 1)
+expanding = col3.checkbox("Expanding window", value=False)
+n_workers = col4.number_input("Worker processes", 1, max(os.cpu_count() or 1, 1), 1, key="backtest_workers")
+
+if len(returns) > window:
+    bt_returns, bt_weights = run_backtest(returns, window, rebalance, expanding, n_workers)
+    fig = px.line((1 + bt_returns).cumprod(), labels={"value": "Growth of $1", "index": "Date"})
+    fig.update_layout(hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+else:
+    st.info(f"Need more than {window} days of returns for the backtest, got {len(returns)}.")
+
+# --- 7. Monte Carlo Risk ---
+st.markdown("#### Monte Carlo Risk", unsafe_allow_html=True)
+st.write("""
+Simulated terminal wealth of $1 in each strategy, with daily returns drawn from the estimated
+mean and covariance (Cholesky, or the factor structure of a factor estimator).
+""")
+col1, col2, col3, col4, col5 = st.columns(5)
+n_paths = col1.select_slider("Paths", [10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000], 100_000)
+horizon = col2.number_input("Horizon (trading days)", 1, 252, 21, 1)
+seed = col3.number_input("Seed", 0, 2**31 - 1, 42, 1)
+rebalance_daily = col4.checkbox("Rebalance daily", value=False, help="Hold constant weights instead of buy and hold")
+mc_workers = col5.number_input("Worker processes", 1, max(os.cpu_count() or 1, 1), 1, key="mc_workers")
+
+mc_report, mc_density = run_simulation(returns, cov_method, cov_params, n_paths, horizon, seed, rebalance_daily, mc_workers)
+st.dataframe(mc_report.style.format("{:.2%}").format({"Mean Wealth": "{:.4f}", "Median Wealth": "{:.4f}"}),
+             use_container_width=True)
+fig = px.line(mc_density, labels={"value": "Density", "index": "Terminal wealth of $1"})
+fig.update_layout(hovermode="x unified")
+st.plotly_chart(fig, use_container_width=True)
+
+# ---- Debug panel ----
+with st.sidebar.expander("🐞 Pipeline stages"):
+    log = pd.DataFrame(stage_log, columns=["Stage", "Cache", "Elapsed (ms)"])
+    st.dataframe(log.style.format({"Elapsed (ms)": "{:.1f}"}), hide_index=True)
+    st.caption(f"{(log['Cache'] == 'miss').sum()} of {len(log)} stage calls recomputed this run.")
+
 
 # col1, col2 = st.columns([1, 1])  # Equal width but stretch to full width
 
@@ -0,0 +1,122 @@
+"""
+Walk-forward backtest of the five allocation strategies.
+
+At every rebalance date the mean and covariance of daily returns are estimated on the trailing
+window (or on everything so far), each strategy picks new weights, and the weights then drift with
+the assets until the next rebalance. All returns are out of sample.
+
+The window moments are kept as running sums: moving the window forward adds the new days and
+drops the old ones as rank-1 updates of the cross-product matrix, instead of recomputing the
+covariance from scratch. Each optimizer is warm started from its previous weights. Rebalance
+dates are cut into contiguous blocks, and every (strategy, block) pair is an independent task,
+so they can be spread over a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from optimizers import gmv_weights, max_sharpe_weights, risk_parity_weights
+
+
+class RollingMoments:
+    # running sum and cross-product sum of the rows currently in the window
+    def __init__(self, n_assets):
+        self.count = 0
+        self.total = np.zeros(n_assets)
+        self.cross = np.zeros((n_assets, n_assets))
+
+    def add(self, rows):
+        self.count += len(rows)
+        self.total += rows.sum(axis=0)
+        self.cross += rows.T @ rows
+
+    def drop(self, rows):
+        self.count -= len(rows)
+        self.total -= rows.sum(axis=0)
+        self.cross -= rows.T @ rows
+
+    def mean(self):
+        return self.total / self.count
+
+    def cov(self):
+        return (self.cross - np.outer(self.total, self.total) / self.count) / (self.count - 1)
+
+
+def equal_weights(mu, cov, w0=None):
+    return np.repeat(1 / len(mu), len(mu))
+
+def inv_vol_weights(mu, cov, w0=None):
+    inv_vol = 1 / np.sqrt(np.diag(cov))
+    return inv_vol / inv_vol.sum()
+
+def markowitz_weights(mu, cov, w0=None):
+    return max_sharpe_weights(mu, cov, w0=w0)
+
+def gmv(mu, cov, w0=None):
+    return gmv_weights(cov, w0=w0)
+
+def risk_parity(mu, cov, w0=None):
+    return risk_parity_weights(cov, w0=w0)
+
+
+STRATEGIES = {
+    "Markowitz": markowitz_weights,
+    "Global Min Var": gmv,
+    "Equal Weighted": equal_weights,
+    "Inverse Volatility": inv_vol_weights,
+    "Vanilla Risk Parity": risk_parity,
+}
+
+
+def rebalance_weights(R, dates, window, expanding, strategy):
+    # weights of one strategy at the rebalance row indices `dates`, rolling the moments forward
+    moments = RollingMoments(R.shape[1])
+    lo = 0 if expanding else dates[0] - window
+    moments.add(R[lo:dates[0]])
+    weights, w = [], None
+    for i, t in enumerate(dates):
+        if i > 0:
+            moments.add(R[dates[i - 1]:t])
+            if not expanding:
+                moments.drop(R[dates[i - 1] - window:t - window])
+        w = STRATEGIES[strategy](moments.mean() * 252, moments.cov() * 252, w)
+        weights.append(w)
+    return np.array(weights)
+
+
+def walk_forward(returns, window=252, rebalance=21, expanding=False, strategies=None, n_workers=1, n_blocks=None):
+    """
+    Out-of-sample backtest of `strategies` (names in STRATEGIES, all five by default).
+
+    Rebalances every `rebalance` days once `window` days of history exist. Returns the daily
+    portfolio returns (dates x strategies) and, per strategy, the weights chosen at each rebalance
+    date (dates x tickers).
+    """
+    strategies = list(STRATEGIES) if strategies is None else list(strategies)
+    R = returns.to_numpy(dtype=float)
+    dates = np.arange(window, len(R), rebalance)
+    if len(dates) == 0:
+        raise ValueError(f"need more than {window} days of returns for a {window} day window")
+
+    # contiguous blocks of rebalance dates, each one started cold and then warm started within
+    blocks = np.array_split(dates, min(n_blocks or n_workers, len(dates)))
+    tasks = [(R, block, window, expanding, s) for s in strategies for block in blocks]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(rebalance_weights, *zip(*tasks)))
+    else:
+        results = [rebalance_weights(*task) for task in tasks]
+
+    port_returns, weights = {}, {}
+    bounds = np.append(dates, len(R))
+    for k, s in enumerate(strategies):
+        W = np.vstack(results[k * len(blocks):(k + 1) * len(blocks)])
+        weights[s] = pd.DataFrame(W, index=returns.index[dates], columns=returns.columns)
+        # buy and hold between rebalances: value of each holding grows with (1 + r)
+        daily = []
+        for w, lo, hi in zip(W, bounds[:-1], bounds[1:]):
+            value = np.cumprod(1 + R[lo:hi], axis=0) @ w
+            daily.append(np.diff(value, prepend=1.0) / np.concatenate([[1.0], value[:-1]]))
+        port_returns[s] = np.concatenate(daily)
+    return pd.DataFrame(port_returns, index=returns.index[dates[0]:]), weights
@@ -0,0 +1,149 @@
+"""
+Covariance estimators for the portfolio app, all annualised (x 252).
+
+- sample: the plain sample covariance.
+- ledoit_wolf: sample covariance shrunk towards a scaled identity with the Ledoit-Wolf (2004)
+  optimal intensity, well conditioned even with more tickers than days.
+- ewma: exponentially weighted covariance with a given half-life in days.
+- pca / fama_french: low-rank factor models  B F B' + diag(D)  with k statistical factors or the
+  Fama-French 3 factors. These return a FactorCovariance that never builds the n x n matrix:
+  C @ w and w' C w cost O(nk), and solves with C + diag(e) use the Woodbury identity in O(nk^2).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+FAMA_FRENCH_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data viz - Shiny R",
+                               "F-F_Research_Data_Factors_daily.csv")
+
+
+class FactorCovariance:
+    # B (n x k) exposures, F (k x k) factor covariance, D (n,) specific variances
+    __array_ufunc__ = None  # so that `w @ C` defers to __rmatmul__
+
+    def __init__(self, B, F, D, index=None):
+        self.B, self.F, self.D = np.asarray(B, dtype=float), np.asarray(F, dtype=float), np.asarray(D, dtype=float)
+        self.index = index
+        self.shape = (len(self.D), len(self.D))
+
+    def __len__(self):
+        return len(self.D)
+
+    def __matmul__(self, w):
+        w = np.asarray(w, dtype=float)
+        return self.B @ (self.F @ (self.B.T @ w)) + (self.D * w.T).T
+
+    def __rmatmul__(self, w):
+        return (self @ np.asarray(w, dtype=float).T).T
+
+    def quad(self, w):
+        # w' C w for one portfolio (n,) or one per row of a (p, n) array
+        w = np.asarray(w, dtype=float)
+        exposure = w @ self.B
+        return np.einsum("...i,ij,...j->...", exposure, self.F, exposure) + (w * w) @ self.D
+
+    def diagonal(self):
+        return np.einsum("ij,jk,ik->i", self.B, self.F, self.B) + self.D
+
+    def block(self, idx):
+        sub = self.B[idx] @ self.F @ self.B[idx].T
+        sub[np.diag_indices(len(idx))] += self.D[idx]
+        return sub
+
+    def solve(self, rhs, shift=0.0):
+        # (C + diag(shift))^-1 rhs by Woodbury
+        d_inv = 1 / (self.D + shift)
+        if rhs.ndim == 2:
+            d_inv = d_inv[:, None]
+        inner = np.linalg.inv(self.F) + self.B.T @ (self.B * (1 / (self.D + shift))[:, None])
+        y = d_inv * rhs
+        return y - d_inv * (self.B @ np.linalg.solve(inner, self.B.T @ y))
+
+    def dense(self):
+        return pd.DataFrame(self.block(np.arange(len(self))), index=self.index, columns=self.index)
+
+
+def sample_cov(returns):
+    return returns.cov() * 252
+
+
+def ledoit_wolf_cov(returns):
+    X = returns.to_numpy(dtype=float)
+    X = X - X.mean(axis=0)
+    T, n = X.shape
+    S = X.T @ X / T
+    m = np.trace(S) / n
+    d2 = np.sum((S - m * np.eye(n))**2) / n
+    # average squared distance of the single-day outer products x x' from S
+    b2 = min((np.sum(np.sum(X * X, axis=1)**2) / T - np.sum(S * S)) / T / n, d2)
+    shrunk = (b2 / d2) * m * np.eye(n) + (1 - b2 / d2) * S
+    return pd.DataFrame(shrunk * 252, index=returns.columns, columns=returns.columns)
+
+
+def ewma_cov(returns, halflife=60):
+    X = returns.to_numpy(dtype=float)
+    weights = 0.5 ** (np.arange(len(X))[::-1] / halflife)
+    weights /= weights.sum()
+    X = X - weights @ X
+    cov = (X * weights[:, None]).T @ X
+    return pd.DataFrame(cov * 252, index=returns.columns, columns=returns.columns)
+
+
+def pca_cov(returns, k=5):
+    X = returns.to_numpy(dtype=float)
+    X = X - X.mean(axis=0)
+    T = len(X)
+    # top-k principal components from the thin SVD, the n x n sample covariance is never formed
+    _, s, Vt = np.linalg.svd(X, full_matrices=False)
+    k = min(k, len(s))
+    B, eig = Vt[:k].T, s[:k]**2 / (T - 1)
+    specific = np.maximum(np.sum(X * X, axis=0) / (T - 1) - (B * B) @ eig, 1e-12)
+    return FactorCovariance(B, np.diag(eig) * 252, specific * 252, index=returns.columns)
+
+
+def load_fama_french(path=FAMA_FRENCH_CSV):
+    # daily Mkt-RF, SMB, HML and RF in decimals, indexed by date
+    factors = pd.read_csv(path, skiprows=4, index_col=0)
+    factors = factors[factors.index.astype(str).str.strip().str.fullmatch(r"\d{8}")]
+    factors.index = pd.to_datetime(factors.index.astype(str).str.strip(), format="%Y%m%d")
+    factors.columns = factors.columns.str.strip()
+    return factors.astype(float) / 100
+
+
+def fama_french_cov(returns, factors=None):
+    factors = load_fama_french() if factors is None else factors
+    dates = returns.index.intersection(factors.index)
+    if len(dates) < 2 * (factors.shape[1] + 1):
+        raise ValueError("the Fama-French factors barely overlap the return dates "
+                         f"({factors.index[0].date()} to {factors.index[-1].date()} available)")
+    R = returns.loc[dates].to_numpy(dtype=float)
+    X = factors.loc[dates, ["Mkt-RF", "SMB", "HML"]].to_numpy()
+    # time series regression of every asset on the 3 factors (with an intercept)
+    design = np.column_stack([np.ones(len(X)), X])
+    coef, *_ = np.linalg.lstsq(design, R, rcond=None)
+    resid = R - design @ coef
+    specific = np.maximum(resid.var(axis=0, ddof=design.shape[1]), 1e-12)
+    return FactorCovariance(coef[1:].T, np.cov(X, rowvar=False) * 252, specific * 252, index=returns.columns)
+
+
+ESTIMATORS = {
+    "Sample": sample_cov,
+    "Ledoit-Wolf": ledoit_wolf_cov,
+    "EWMA": ewma_cov,
+    "PCA factor": pca_cov,
+    "Fama-French factor": fama_french_cov,
+}
+
+
+def estimate_covariance(returns, method="Sample", **kwargs):
+    return ESTIMATORS[method](returns, **kwargs)
+
+
+def portfolio_variance(cov, W):
+    # w' C w for one portfolio or one per row of W, dense or factor covariance
+    if isinstance(cov, FactorCovariance):
+        return cov.quad(W)
+    cov = np.asarray(cov, dtype=float)
+    return np.einsum("...i,ij,...j->...", W, cov, W)
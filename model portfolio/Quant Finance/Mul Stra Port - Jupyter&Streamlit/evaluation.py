@@ -0,0 +1,57 @@
+"""
+Scores many weight vectors at once.
+
+The weights are stacked into an (assets x portfolios) matrix W, one matmul R @ W gives every
+portfolio's daily returns, and cumulative returns, drawdowns, risk contributions and the summary
+statistics are all computed column-wise on 2-D arrays, so hundreds of candidates cost about the
+same Python overhead as one.
+"""
+import numpy as np
+import pandas as pd
+
+
+def drawdown_durations(dd):
+    # longest run of days below the running peak, per column
+    t = np.arange(len(dd))[:, None]
+    last_peak = np.maximum.accumulate(np.where(dd <= 0, t, -1), axis=0)
+    return (t - last_peak).max(axis=0)
+
+
+def evaluate_weights(returns, W, cov, names=None):
+    """
+    returns: (days x assets) DataFrame of daily returns, W: (assets x portfolios) weights,
+    cov: annualised covariance (dense or FactorCovariance).
+
+    Returns DataFrames of cumulative returns and drawdowns (days x portfolios), risk
+    contributions (assets x portfolios) and summary statistics (portfolios x metrics).
+    """
+    W = np.asarray(W, dtype=float)
+    names = list(range(W.shape[1])) if names is None else list(names)
+    P = returns.to_numpy(dtype=float) @ W
+
+    cum = np.cumprod(1 + P, axis=0)
+    peak = np.maximum.accumulate(cum, axis=0)
+    dd = (peak - cum) / peak
+    rc = W * np.asarray(cov @ W)
+    rc /= rc.sum(axis=0)
+
+    days = len(P)
+    mean, std = P.mean(axis=0), P.std(axis=0, ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(P, 0.0)**2, axis=0))
+    cagr = cum[-1] ** (252 / days) - 1
+    max_dd = dd.max(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats = pd.DataFrame({
+            "Annual Return": cagr,
+            "Annual Volatility": std * np.sqrt(252),
+            "Sharpe": mean / std * np.sqrt(252),
+            "Sortino": mean / downside * np.sqrt(252),
+            "Calmar": cagr / max_dd,
+            "Max Drawdown": max_dd,
+            "Max Drawdown Duration (days)": drawdown_durations(dd),
+        }, index=names)
+
+    return (pd.DataFrame(cum, index=returns.index, columns=names),
+            pd.DataFrame(dd, index=returns.index, columns=names),
+            pd.DataFrame(rc, index=returns.columns, columns=names),
+            stats)
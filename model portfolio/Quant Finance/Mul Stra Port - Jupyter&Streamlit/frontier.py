@@ -0,0 +1,63 @@
+"""
+Efficient frontier: minimum variance portfolios for a sweep of target returns.
+
+Long-only, each point is the QP  min w' C w  s.t.  1'w = 1,  mu'w = r,  w >= 0, solved by the
+active-set method of optimizers.py. Targets are swept upwards from the GMV return to the best
+single asset, and each point is warm started from its neighbour: mixing the previous solution with
+the best asset reaches the new target exactly, so the start is feasible and its support is
+usually the final one. The sweep can be cut into contiguous blocks (each started from GMV) and
+spread over a process pool. With short selling allowed, the frontier is the closed form two-fund
+solution.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from covariance import portfolio_variance
+from optimizers import active_set_qp, as_cov, gmv_weights, solve_cov
+
+
+def frontier_block(mu, cov, targets, w_start):
+    # sweeps `targets` (increasing) from a feasible portfolio with return <= targets[0]
+    A = np.vstack([np.ones(len(mu)), mu])
+    best = np.argmax(mu)
+    w, weights = w_start, []
+    for r in targets:
+        # mix with the best asset so that the start has return exactly r
+        t = (r - w @ mu) / (mu[best] - w @ mu) if mu[best] > w @ mu else 0.0
+        x0 = (1 - t) * w
+        x0[best] += t
+        w = active_set_qp(cov, A, np.array([1.0, r]), x0)
+        weights.append(w)
+    return np.array(weights)
+
+
+def efficient_frontier(mu, cov, n_points=200, long_only=True, n_workers=1, n_blocks=None):
+    """
+    Returns a DataFrame with the return, volatility and Sharpe ratio of `n_points` frontier
+    portfolios (from the global minimum variance portfolio upwards) and their weights (points x assets).
+    """
+    mu, cov = np.asarray(mu, dtype=float), as_cov(cov)
+    w_gmv = gmv_weights(cov, long_only=long_only)
+    r_max = mu.max() if long_only else mu.max() * 2 - w_gmv @ mu
+    targets = np.linspace(w_gmv @ mu, r_max, n_points)
+
+    if not long_only:
+        # w(r) = C^-1 (l1 * 1 + l2 * mu), with l1, l2 from the two equality constraints
+        Z = solve_cov(cov, np.column_stack([np.ones(len(mu)), mu]))
+        M = np.column_stack([np.ones(len(mu)), mu]).T @ Z
+        lams = np.linalg.solve(M, np.vstack([np.ones(n_points), targets]))
+        weights = (Z @ lams).T
+    else:
+        blocks = np.array_split(targets, min(n_blocks or n_workers, n_points))
+        tasks = [(mu, cov, block, w_gmv) for block in blocks]
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                weights = np.vstack(list(pool.map(frontier_block, *zip(*tasks))))
+        else:
+            weights = np.vstack([frontier_block(*task) for task in tasks])
+
+    ret = weights @ mu
+    vol = np.sqrt(portfolio_variance(cov, weights))
+    return pd.DataFrame({"Return": ret, "Volatility": vol, "Sharpe": ret / vol}), weights
@@ -0,0 +1,85 @@
+"""
+Monte Carlo simulation of portfolio wealth over a horizon of trading days.
+
+By default the portfolios are bought and held, so the assets themselves are simulated.
+
+Daily asset returns are drawn as mu/252 + L z, with L the Cholesky factor of the daily covariance,
+or, for a FactorCovariance, as mu/252 + B chol(F) z_f + sqrt(D) e, which costs O(nk) per draw
+instead of O(n^2). Paths are generated in chunks sized to a memory budget, and only the running
+growth of each asset is kept, so memory does not grow with the horizon or the number of paths.
+
+With `rebalance_daily=True` the portfolios are held at constant weights instead, so each one
+only needs its own daily return w'r; those are drawn directly from the Cholesky factor of the
+(portfolios x portfolios) covariance W' C W, which is exact and does not depend on the number
+of assets.
+
+Every chunk has its own numpy Generator, spawned from one SeedSequence, so chunks can be spread
+over worker processes and the result is the same for any number of workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from covariance import FactorCovariance
+
+
+def daily_sampler(mu, cov):
+    # returns a function (generator, n_paths) -> (n_paths, n_assets) daily returns
+    mu = np.asarray(mu, dtype=float) / 252
+    if isinstance(cov, FactorCovariance):
+        B = cov.B @ np.linalg.cholesky(cov.F / 252)
+        specific = np.sqrt(cov.D / 252)
+        return lambda rng, m: mu + rng.standard_normal((m, B.shape[1])) @ B.T + rng.standard_normal((m, len(mu))) * specific
+    # the Cholesky factor of a PSD matrix with a tiny jitter, in case of numerical rank deficiency
+    C = np.asarray(cov, dtype=float) / 252
+    L = np.linalg.cholesky(C + 1e-12 * np.trace(C) / len(C) * np.eye(len(C)))
+    return lambda rng, m: mu + rng.standard_normal((m, len(mu))) @ L.T
+
+
+def simulate_chunk(mu, cov, W, n_paths, horizon, seed, rebalance_daily=False):
+    rng = np.random.default_rng(seed)
+    if rebalance_daily:
+        # constant weights: simulate the portfolio returns themselves
+        draw = daily_sampler(W.T @ np.asarray(mu, dtype=float), W.T @ np.asarray(cov @ W))
+    else:
+        draw = daily_sampler(mu, cov)
+    growth = np.ones((n_paths, W.shape[1] if rebalance_daily else W.shape[0]))
+    for _ in range(horizon):
+        growth *= 1 + draw(rng, n_paths)
+    return growth if rebalance_daily else growth @ W
+
+
+def simulate_wealth(mu, cov, W, n_paths=100_000, horizon=21, seed=42, rebalance_daily=False, n_workers=1,
+                    max_chunk_bytes=64 * 2**20):
+    """
+    Terminal wealth per $1 of each portfolio (columns of W, assets x portfolios) after `horizon`
+    trading days, for `n_paths` simulated paths: an (n_paths x portfolios) array.
+    """
+    W = np.asarray(W, dtype=float)
+    width = W.shape[1] if rebalance_daily else W.shape[0]
+    chunk = int(max(1_000, max_chunk_bytes // (8 * 3 * width)))
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(mu, cov, W, m, horizon, s, rebalance_daily) for m, s in zip(sizes, seeds)]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return np.vstack(list(pool.map(simulate_chunk, *zip(*tasks))))
+    return np.vstack([simulate_chunk(*task) for task in tasks])
+
+
+def risk_report(wealth, names=None, levels=(0.95, 0.99)):
+    # VaR and CVaR are losses per $1 invested, reported as positive numbers
+    names = list(range(wealth.shape[1])) if names is None else list(names)
+    loss = 1 - wealth
+    report = {
+        "Mean Wealth": wealth.mean(axis=0),
+        "Median Wealth": np.median(wealth, axis=0),
+        "P(Loss)": (loss > 0).mean(axis=0),
+    }
+    for level in levels:
+        var = np.quantile(loss, level, axis=0)
+        tail = np.where(loss >= var, loss, np.nan)
+        report[f"VaR {level:.0%}"] = var
+        report[f"CVaR {level:.0%}"] = np.nanmean(tail, axis=0)
+    return pd.DataFrame(report, index=names)
@@ -0,0 +1,158 @@
+"""
+Portfolio optimizers on plain NumPy arrays.
+
+- Global minimum variance and maximum Sharpe are both solved as the QP
+      min 1/2 x' C x  s.t.  a' x = 1,  x >= 0
+  (a = 1 for GMV; a = mu for max Sharpe, with weights x / sum(x)) by a primal active-set method
+  started from the single best asset, so each step only factors the covariance of the assets
+  currently held. Without the long-only constraint both have a closed form.
+- Risk parity minimises 1/2 y' C y - sum(b_i log y_i) by Newton's method with the analytic
+  gradient and Hessian; at the optimum every asset contributes b_i of the risk.
+
+The covariance can be a dense array or a low-rank FactorCovariance (see covariance.py): the
+solvers only use C @ x, its diagonal, sub-blocks of the assets held, and solves with C plus a
+diagonal, which a factor model does in O(nk) / O(nk^2) without building the n x n matrix.
+
+Every long-only solver takes optional previous weights `w0` as a warm start (the active set of
+the QP, the starting point of Newton), which is what a rebalancing backtest needs.
+"""
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+
+from covariance import FactorCovariance
+
+
+def solve_psd(C, b):
+    try:
+        return cho_solve(cho_factor(C), b)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(C, b, rcond=None)[0]
+
+
+def as_cov(cov):
+    # factor covariances are used as they are, anything else as a dense float array
+    return cov if isinstance(cov, FactorCovariance) else np.asarray(cov, dtype=float)
+
+
+def cov_block(C, idx):
+    return C.block(idx) if isinstance(C, FactorCovariance) else C[np.ix_(idx, idx)]
+
+
+def solve_cov(C, b, shift=0.0):
+    # (C + diag(shift))^-1 b
+    if isinstance(C, FactorCovariance):
+        return C.solve(b, shift)
+    return solve_psd(C + np.diag(np.broadcast_to(shift, len(C))), b)
+
+
+def active_set_qp(C, A, b, x, tol=1e-12, max_iter=None):
+    # min 1/2 x' C x  s.t.  A x = b, x >= 0, from a feasible x; its support is the first free set
+    n, k = len(x), len(b)
+    x = x.copy()
+    free = x > 0
+    for _ in range(max_iter or 10 * n):
+        # equality constrained optimum on the free assets: C_FF x_F + A_F' nu = 0, A_F x_F = b
+        idx = np.flatnonzero(free)
+        A_F = A[:, idx]
+        kkt = np.block([[cov_block(C, idx), A_F.T], [A_F, np.zeros((k, k))]])
+        rhs = np.concatenate([np.zeros(len(idx)), b])
+        try:
+            sol = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            sol = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        target, nu = sol[:len(idx)], sol[len(idx):]
+
+        if np.all(target >= -tol):
+            x[:] = 0.0
+            x[idx] = np.maximum(target, 0.0)
+            # multipliers of the bounds x_i >= 0 still held at zero
+            grad = C @ x + A.T @ nu
+            grad[free] = np.inf
+            i = np.argmin(grad)
+            if grad[i] >= -tol * max(1.0, np.abs(nu).max()):
+                return x
+            free[i] = True
+        else:
+            # move towards the target until the first free asset hits zero
+            current = x[idx]
+            blocking = target < current
+            steps = np.where(blocking, current / np.where(blocking, current - target, 1.0), np.inf)
+            j = np.argmin(steps)
+            x[idx] = current + steps[j] * (target - current)
+            free[idx[j]] = False
+            x[idx[j]] = 0.0
+    return x
+
+
+def min_quadratic_on_simplex(C, a, x0=None, tol=1e-12, max_iter=None):
+    # min 1/2 x' C x  s.t.  a' x = 1, x >= 0, assumes some a_i > 0
+    if x0 is not None and a @ np.maximum(x0, 0.0) > 0:
+        # warm start: previous solution rescaled onto the constraint
+        x = np.maximum(x0, 0.0) / (a @ np.maximum(x0, 0.0))
+    else:
+        # cold start: the single asset with the lowest variance per unit of a
+        ratio = np.where(a > 0, C.diagonal() / np.where(a > 0, a, 1.0)**2, np.inf)
+        j = np.argmin(ratio)
+        x = np.zeros(len(a))
+        x[j] = 1 / a[j]
+    return active_set_qp(C, a[None, :], np.ones(1), x, tol, max_iter)
+
+
+def gmv_weights(cov, long_only=True, w0=None):
+    cov = as_cov(cov)
+    ones = np.ones(len(cov))
+    if not long_only:
+        z = solve_cov(cov, ones)
+        return z / z.sum()
+    return min_quadratic_on_simplex(cov, ones, w0)
+
+
+def sharpe_and_gradient(w, mu, cov):
+    # negative Sharpe ratio and its gradient, for the general solver fallback
+    cw = cov @ w
+    vol = np.sqrt(w @ cw)
+    ret = w @ mu
+    return -ret / vol, -(mu / vol - ret * cw / vol**3)
+
+
+def max_sharpe_weights(mu, cov, long_only=True, rf=0.0, w0=None):
+    mu, cov = np.asarray(mu, dtype=float) - rf, as_cov(cov)
+    n = len(mu)
+    if not long_only:
+        z = solve_cov(cov, mu)
+        return z / z.sum()
+    if np.any(mu > 0):
+        y = min_quadratic_on_simplex(cov, mu, w0)
+        return y / y.sum()
+    # no asset beats rf: the QP reduction does not apply, fall back to SLSQP with the analytic gradient
+    res = minimize(sharpe_and_gradient, np.repeat(1/n, n) if w0 is None else w0, args=(mu, cov), jac=True, method="SLSQP",
+                   bounds=[(0, 1)] * n,
+                   constraints=[{'type': 'eq', 'fun': lambda w: np.sum(w) - 1, 'jac': lambda w: np.ones(n)}])
+    return res.x
+
+
+def risk_parity_weights(cov, budget=None, w0=None, tol=1e-10, max_iter=100):
+    cov = as_cov(cov)
+    n = len(cov)
+    b = np.repeat(1/n, n) if budget is None else np.asarray(budget, dtype=float) / np.sum(budget)
+
+    def objective(y):
+        return 0.5 * y @ cov @ y - b @ np.log(y)
+
+    # start from the previous weights or inverse volatility, scaled so that y' C y = 1
+    y = 1 / np.sqrt(cov.diagonal()) if w0 is None else np.maximum(w0, 1e-8)
+    y /= np.sqrt(y @ cov @ y)
+    for _ in range(max_iter):
+        cy = cov @ y
+        # risk contributions y_i (C y)_i equal to the budget b_i
+        if np.max(np.abs(y * cy - b)) <= tol * b.max():
+            break
+        grad = cy - b / y
+        step = solve_cov(cov, grad, b / y**2)
+        # damped Newton step, backtracking keeps y > 0 and decreases the objective
+        t = 1.0
+        while np.any(y - t * step <= 0) or objective(y - t * step) > objective(y) - 0.25 * t * (grad @ step):
+            t *= 0.5
+        y = y - t * step
+    return y / y.sum()
@@ -0,0 +1,114 @@
+"""
+On-disk cache of daily close prices, one Parquet file per ticker.
+
+The store remembers which date ranges it has already asked yfinance for (per ticker, in
+`coverage.json` next to the Parquet files), so a request only downloads the parts of
+[start, end) that are not covered yet, and overlapping windows are served from disk.
+Ranges are only marked as covered up to yesterday, so recent days are fetched again once final.
+
+Offline mode never touches the network: point the store at a fixture directory with the same
+layout (for example a copy of a cache directory filled online) and every request is served from
+it, missing tickers or dates raise a KeyError.
+"""
+import json
+import os
+
+import pandas as pd
+
+
+class PriceStore:
+    def __init__(self, directory="price_cache", offline=False):
+        self.directory = directory
+        self.offline = offline
+        self.coverage_path = os.path.join(directory, "coverage.json")
+        if not offline:
+            os.makedirs(directory, exist_ok=True)
+        self.coverage = {}
+        if os.path.exists(self.coverage_path):
+            with open(self.coverage_path) as f:
+                self.coverage = {t: [tuple(map(pd.Timestamp, r)) for r in ranges] for t, ranges in json.load(f).items()}
+        self.downloads = 0
+
+    def path(self, ticker):
+        return os.path.join(self.directory, f"{ticker}.parquet")
+
+    def read(self, ticker):
+        if not os.path.exists(self.path(ticker)):
+            return pd.Series(dtype=float, name=ticker)
+        return pd.read_parquet(self.path(ticker))["Close"].rename(ticker)
+
+    def write(self, ticker, closes):
+        closes.rename("Close").to_frame().to_parquet(self.path(ticker))
+
+    def missing(self, ticker, start, end):
+        # parts of [start, end) not covered by earlier downloads
+        gaps, cursor = [], start
+        for lo, hi in sorted(self.coverage.get(ticker, [])):
+            if hi <= cursor:
+                continue
+            if lo >= end:
+                break
+            if lo > cursor:
+                gaps.append((cursor, lo))
+            cursor = max(cursor, hi)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def mark_covered(self, ticker, start, end):
+        ranges = sorted(self.coverage.get(ticker, []) + [(start, end)])
+        merged = [ranges[0]]
+        for lo, hi in ranges[1:]:
+            if lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self.coverage[ticker] = merged
+
+    def save_coverage(self):
+        with open(self.coverage_path, "w") as f:
+            json.dump({t: [[str(lo.date()), str(hi.date())] for lo, hi in r] for t, r in self.coverage.items()}, f, indent=1)
+
+    def download(self, tickers, start, end):
+        import yfinance as yf
+
+        self.downloads += 1
+        closes = yf.download(tickers, start=start, end=end, progress=False)["Close"]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+        return closes
+
+    def fetch_missing(self, tickers, start, end):
+        # tickers with the same gap are downloaded together, one yfinance call per distinct gap
+        covered_until = min(end, pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+        by_gap = {}
+        for ticker in tickers:
+            for gap in self.missing(ticker, start, end):
+                by_gap.setdefault(gap, []).append(ticker)
+        for (lo, hi), group in by_gap.items():
+            closes = self.download(group, lo, hi)
+            for ticker in group:
+                new = closes[ticker].dropna() if ticker in closes else pd.Series(dtype=float)
+                # no data for a ticker is a failed download of it, its gap stays open
+                if not len(new):
+                    continue
+                stored = self.read(ticker)
+                merged = pd.concat([stored[stored.index.difference(new.index)], new]).sort_index()
+                self.write(ticker, merged)
+                if lo < covered_until:
+                    self.mark_covered(ticker, lo, min(hi, covered_until))
+        if by_gap:
+            self.save_coverage()
+
+    def get_prices(self, tickers, start, end):
+        """Daily closes of `tickers` on [start, end), one column per ticker."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if self.offline:
+            for ticker in tickers:
+                if not os.path.exists(self.path(ticker)) or self.missing(ticker, start, end):
+                    raise KeyError(f"{ticker} from {start.date()} to {end.date()} is not in the fixtures at {self.directory}")
+        else:
+            self.fetch_missing(tickers, start, end)
+        prices = pd.concat([self.read(ticker) for ticker in tickers], axis=1)
+        prices.index.name = "Date"
+        return prices[(prices.index >= start) & (prices.index < end)]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from covariance import pca_cov
+from montecarlo import simulate_wealth
+
+
+def returns(columns, days=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(0.0005, 0.01, (days, len(columns))), columns=columns)
+
+
+def test_dense_covariance_with_single_letter_tickers():
+    # tickers named like FactorCovariance's attributes must not be mistaken for a factor model
+    R = returns(["B", "F", "D"])
+    cov = R.cov() * 252
+    mu = R.mean() * 252
+    W = np.eye(3)
+    wealth = simulate_wealth(mu, cov, W, n_paths=2_000, horizon=5)
+    expected = simulate_wealth(mu.to_numpy(), cov.to_numpy(), W, n_paths=2_000, horizon=5)
+    assert wealth.shape == (2_000, 3)
+    np.testing.assert_allclose(wealth, expected)
+
+
+def test_factor_covariance_is_sampled_from_its_factors():
+    R = returns(list("ABCDEFGH"))
+    cov = pca_cov(R, k=2)
+    W = np.full((8, 1), 1 / 8)
+    wealth = simulate_wealth(R.mean() * 252, cov, W, n_paths=20_000, horizon=1)
+    daily_var = (W[:, 0] @ cov.dense().to_numpy() @ W[:, 0]) / 252
+    np.testing.assert_allclose(wealth.var(), daily_var, rtol=0.05)
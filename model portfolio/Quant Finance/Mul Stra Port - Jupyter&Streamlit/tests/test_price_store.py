@@ -0,0 +1,92 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import PriceStore
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "price_cache")
+
+
+class RecordingStore(PriceStore):
+    """A store whose downloads come from a function of (tickers, start, end) instead of yfinance."""
+
+    def __init__(self, directory, source):
+        super().__init__(directory)
+        self.source = source
+        self.calls = []
+
+    def download(self, tickers, start, end):
+        self.downloads += 1
+        self.calls.append((list(tickers), start, end))
+        return self.source(tickers, start, end)
+
+
+def synthetic(tickers, start, end):
+    dates = pd.bdate_range(start, end - pd.Timedelta(days=1), name="Date")
+    return pd.DataFrame({t: np.linspace(1, 2, len(dates)) for t in tickers}, index=dates)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return shutil.copytree(FIXTURES, tmp_path / "price_cache")
+
+
+def test_offline_store_serves_the_fixtures():
+    prices = PriceStore(FIXTURES, offline=True).get_prices(["AAA", "BBB"], "2020-02-01", "2020-03-01")
+    assert list(prices.columns) == ["AAA", "BBB"]
+    assert prices.index.min() >= pd.Timestamp("2020-02-01")
+    assert prices.index.max() < pd.Timestamp("2020-03-01")
+    assert len(prices) == len(pd.bdate_range("2020-02-01", "2020-02-29"))
+
+
+def test_offline_store_raises_on_gaps():
+    store = PriceStore(FIXTURES, offline=True)
+    with pytest.raises(KeyError):
+        store.get_prices(["AAA"], "2020-06-01", "2020-08-01")
+    with pytest.raises(KeyError):
+        store.get_prices(["CCC"], "2020-02-01", "2020-03-01")
+
+
+def test_missing_finds_the_uncovered_parts():
+    store = PriceStore(FIXTURES, offline=True)
+    store.mark_covered("AAA", pd.Timestamp("2020-09-01"), pd.Timestamp("2020-10-01"))
+    gaps = store.missing("AAA", pd.Timestamp("2019-12-01"), pd.Timestamp("2020-12-01"))
+    assert gaps == [
+        (pd.Timestamp("2019-12-01"), pd.Timestamp("2020-01-01")),
+        (pd.Timestamp("2020-07-01"), pd.Timestamp("2020-09-01")),
+        (pd.Timestamp("2020-10-01"), pd.Timestamp("2020-12-01")),
+    ]
+    assert store.missing("AAA", pd.Timestamp("2020-02-01"), pd.Timestamp("2020-03-01")) == []
+
+
+def test_only_the_gap_is_downloaded(cache_dir):
+    store = RecordingStore(cache_dir, synthetic)
+    cached = store.read("AAA")
+    prices = store.get_prices(["AAA", "BBB"], "2020-03-01", "2020-09-01")
+
+    # one call for both tickers, for the part after the fixtures only
+    assert store.calls == [(["AAA", "BBB"], pd.Timestamp("2020-07-01"), pd.Timestamp("2020-09-01"))]
+    pd.testing.assert_series_equal(prices.loc[:"2020-06-30", "AAA"], cached.loc["2020-03-01":], check_names=False)
+    assert prices.index.max() == pd.Timestamp("2020-08-31")
+
+    # the top-up is on disk and covered: a new store does not download again
+    again = RecordingStore(cache_dir, synthetic)
+    pd.testing.assert_frame_equal(again.get_prices(["AAA", "BBB"], "2020-03-01", "2020-09-01"), prices)
+    assert again.calls == []
+
+
+def test_ticker_missing_from_a_group_download_stays_uncovered(cache_dir):
+    # BBB gets no data in the download that fills AAA's gap
+    store = RecordingStore(cache_dir, lambda tickers, start, end: synthetic(["AAA"], start, end))
+    store.get_prices(["AAA", "BBB"], "2020-03-01", "2020-09-01")
+    assert store.missing("AAA", pd.Timestamp("2020-03-01"), pd.Timestamp("2020-09-01")) == []
+    assert store.missing("BBB", pd.Timestamp("2020-03-01"), pd.Timestamp("2020-09-01")) == [
+        (pd.Timestamp("2020-07-01"), pd.Timestamp("2020-09-01"))]
+
+    retry = RecordingStore(cache_dir, synthetic)
+    retry.get_prices(["AAA", "BBB"], "2020-03-01", "2020-09-01")
+    assert retry.calls == [(["BBB"], pd.Timestamp("2020-07-01"), pd.Timestamp("2020-09-01"))]
@@ -1,8 +1,15 @@
+import os
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
+
+from svi_arbitrage import check_surface
+from svi_calibration import CalibrationError, calibrate_surface, svi
+from svi_render import SurfaceView
+
 st.set_page_config(layout="wide")
 
 st.title("3D SVI Implied Volatility Surface")
@@ -20,19 +27,31 @@ st.latex(r'''
 w(k, \theta) = a + b \left[ \rho (k - m) + \sqrt{(k - m)^2 + \sigma^2} \right]
 ''')
 
-# Define SVI function for a single maturity
-def svi(k, params):
-    a, b, rho, m, sigma = params
-    return a + b*(rho*(k - m) + np.sqrt((k - m)**2 + sigma**2))
+# Parameters as (n_T, 1) columns, each one linear in T
+def svi_params_by_maturity(T_values, params, slopes):
+    T_col = np.asarray(T_values, dtype=float)[:, None]
+    a, b, rho, m, sigma = (p + dp*T_col for p, dp in zip(params, slopes))
+    return a, np.maximum(b, 0.0), np.clip(rho, -0.999, 0.999), m, np.maximum(sigma, 1e-4)
+
+# Implied vol on the whole (T, k) meshgrid in one broadcast
+def implied_vol_surface(K, T, params):
+    w = svi(K, params)
+    return np.sqrt(np.maximum(w, 0.0) / T)
 
 # Generate grid of log-moneyness (k) and maturities (T)
-k_min, k_max, k_step = -1.0, 1.0, 0.05
-T_min, T_max, T_step = 0.1, 2.0, 0.1
+k_min, k_max = -1.0, 1.0
+T_min, T_max = 0.1, 2.0
 
-k_values = np.arange(k_min, k_max + k_step, k_step)
-T_values = np.arange(T_min, T_max + T_step, T_step)
+st.sidebar.header("Grid")
+n_k = st.sidebar.slider("Strike points (k)", 21, 2000, 200, 1)
+n_T = st.sidebar.slider("Maturity points (T)", 10, 500, 50, 1)
+
+k_values = np.linspace(k_min, k_max, n_k)
+T_values = np.linspace(T_min, T_max, n_T)
 K, T = np.meshgrid(k_values, T_values)
 
+st.sidebar.header("SVI parameters")
+
 # SVI parameters (can be adjusted)
 a = st.sidebar.slider("a (SVI parameter)", 0.01, 0.1, 0.05, 0.01)
 b = st.sidebar.slider("b (SVI parameter)", 0.0, 0.5, 0.1, 0.01)
@@ -42,31 +61,43 @@ sigma = st.sidebar.slider("sigma (SVI parameter)", 0.1, 0.5, 0.2, 0.01)
 
 params = (a, b, rho, m, sigma)
 
-# For each (k, T) pair, calculate implied volatility using SVI-inspired formula
-# Example: vary SVI parameters with T
-# def implied_vol(k, T, params=None):
-#     # a, b, rho, m, sigma = params
-#     a = 0.01 + 0.005*T
-#     b = 0.1 + 0.02*T
-#     rho = -0.3 + 0.1*T
-#     m = 0.0
-#     sigma = 0.2
-#     w = svi(k, a, b, rho, m, sigma)
-#     return np.sqrt(w / T) if T > 0 else 0.0
+# Optionally vary the SVI parameters with T (change per year of maturity)
+if st.sidebar.checkbox("Vary parameters with maturity", value=False):
+    slopes = (
+        st.sidebar.slider("a per year", -0.05, 0.05, 0.005, 0.001),
+        st.sidebar.slider("b per year", -0.2, 0.2, 0.02, 0.01),
+        st.sidebar.slider("rho per year", -0.5, 0.5, 0.1, 0.01),
+        st.sidebar.slider("m per year", -0.2, 0.2, 0.0, 0.01),
+        st.sidebar.slider("sigma per year", -0.2, 0.2, 0.0, 0.01),
+    )
+    params = svi_params_by_maturity(T_values, params, slopes)
+
+# Calculate implied volatility for every (k, T) pair at once
+impli_vol = implied_vol_surface(K, T, params)
 
-impli_vol = np.sqrt(np.array([[svi(k,params)/t for k in k_values] for t in T_values]))
+# Static arbitrage: Durrleman's g(k) per slice and calendar monotonicity of w(k, T)
+check_arbitrage = st.sidebar.checkbox("Highlight static arbitrage", value=True)
+if check_arbitrage:
+    start_time = time.perf_counter()
+    butterfly, calendar = check_surface(K, params)
+    check_ms = (time.perf_counter() - start_time) * 1e3
 
 
 # --- Plot ---
-fig = go.Figure(
-    data=[go.Surface(
-        z=impli_vol, 
-        x=K, 
-        y=T, 
-        colorscale='Jet',
-        showscale=True 
-)])
-fig.update_layout(
+# Decimated float32 view of the grid, rebuilt only when the grid or the vertex budget changes
+max_vertices = st.sidebar.number_input("Rendered vertices (max)", 2_500, 1_000_000, 40_000, 2_500)
+view = st.session_state.get("surface_view")
+if view is None or view.key != (n_k, k_min, k_max, n_T, T_min, T_max, max_vertices):
+    view = st.session_state["surface_view"] = SurfaceView(k_values, T_values, max_vertices)
+
+traces = {"Implied volatility": (impli_vol, True, dict(colorscale='Jet', showscale=True))}
+if check_arbitrage:
+    # violating cells drawn again on top in a solid colour, everything else left as gaps
+    for mask, color, name in ((butterfly, "black", "Butterfly arbitrage"), (calendar, "magenta", "Calendar arbitrage")):
+        traces[name] = (np.where(mask, impli_vol, np.nan), bool(mask.any()),
+                        dict(colorscale=[[0, color], [1, color]], showscale=False, showlegend=True))
+fig = view.figure(
+    traces,
     # title="3D SVI-like Implied Volatility Surface",
     scene=dict(
         xaxis_title="Log-moneyness (k)",
@@ -79,25 +110,61 @@ fig.update_layout(
     width=800,
 )
 
-st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(fig, use_container_width=True, key="svi_surface")
+if check_arbitrage:
+    st.caption(f"Butterfly arbitrage: {butterfly.mean():.1%} of cells, calendar arbitrage: {calendar.mean():.1%} of cells "
+               f"(checked in {check_ms:.1f} ms)")
 
 
+# --- Calibration to quotes ---
+st.header("Calibrate SVI to quotes")
+st.write("""
+Fits one raw-SVI slice per maturity to (k, T, total variance) quotes, with the quasi-explicit
+method: a 2-parameter search over (m, sigma) and a linear least squares solve for (a, b, rho).
+Upload a CSV with columns `k`, `T` and `w` (total variance), or `k`, `T` and `iv`.
+Without a file, noisy quotes are sampled from the surface above.
+""")
 
-
-# # reate the figure and 3D axis
-# fig = plt.figure(figsize=(10, 7))
-# ax = fig.add_subplot(111, projection='3d')
-
-# # Plot the surface
-# surf = ax.plot_surface(K, T, Z1, cmap='viridis', linewidth=0, antialiased=True)
-
-# # Customize the plot
-# ax.set_xlabel('Log-moneyness (k)')
-# ax.set_ylabel('Maturity (T)')
-# ax.set_zlabel('Implied Volatility')
-# ax.set_title('3D SVI-like Implied Volatility Surface')
-
-# # Add a color bar
-# fig.colorbar(surf, shrink=0.5, aspect=10)
-
-# plt.show()
+@st.cache_data
+def calibrate_quotes(k, T, w, n_workers):
+    return calibrate_surface(k, T, w, n_workers=n_workers)
+
+uploaded = st.file_uploader("Quotes (CSV)", type="csv")
+if uploaded is not None:
+    quotes = pd.read_csv(uploaded)
+    if "w" not in quotes:
+        quotes["w"] = quotes["iv"]**2 * quotes["T"]
+else:
+    rng = np.random.default_rng(0)
+    T_quotes = np.repeat(np.linspace(T_min, T_max, 20), 25)
+    k_quotes = np.tile(np.linspace(k_min, k_max, 25), 20)
+    rows = np.searchsorted(T_values, T_quotes).clip(0, len(T_values) - 1)
+    slice_params = [np.broadcast_to(p, (len(T_values), 1))[rows, 0] for p in params]
+    w_quotes = svi(k_quotes, slice_params) * (1 + 0.01*rng.standard_normal(len(k_quotes)))
+    quotes = pd.DataFrame({"k": k_quotes, "T": T_quotes, "w": w_quotes})
+
+n_workers = st.number_input("Worker processes", 1, max(os.cpu_count() or 1, 1), 1)
+calibrated = None
+if st.button("Calibrate"):
+    try:
+        calibrated = calibrate_quotes(quotes["k"].to_numpy(), quotes["T"].to_numpy(), quotes["w"].to_numpy(), n_workers)
+    except CalibrationError as e:
+        st.error(f"Calibration failed: {e}")
+
+if calibrated is not None:
+    maturities, fitted, rmse = calibrated
+    fit_table = pd.DataFrame(fitted, columns=["a", "b", "rho", "m", "sigma"])
+    fit_table.insert(0, "T", maturities)
+    fit_table["rmse"] = rmse
+    st.dataframe(fit_table, hide_index=True)
+
+    # fitted slices on the quoted maturities, quotes on top
+    K_fit, T_fit = np.meshgrid(k_values, maturities)
+    fit_vol = implied_vol_surface(K_fit, T_fit, tuple(fitted.T[:, :, None]))
+    fit_fig = go.Figure(data=[
+        go.Surface(z=fit_vol, x=K_fit, y=T_fit, colorscale='Jet', opacity=0.8, showscale=False),
+        go.Scatter3d(x=quotes["k"], y=quotes["T"], z=np.sqrt(quotes["w"] / quotes["T"]),
+                     mode="markers", marker=dict(size=2, color="black"), name="quotes"),
+    ])
+    fit_fig.update_layout(scene=fig.layout.scene, margin=dict(l=0, r=0, b=0, t=40), height=600)
+    st.plotly_chart(fit_fig, use_container_width=True)
@@ -0,0 +1,151 @@
+"""
+Raw-SVI calibration, one slice per maturity.
+
+Quasi-explicit method (Zeliade, 2009): with y = (k - m) / sigma the raw-SVI total variance
+    w(k) = a + b*(rho*(k - m) + sqrt((k - m)**2 + sigma**2))
+becomes linear in (a, d, c) = (a, rho*b*sigma, b*sigma):
+    w(y) = a + d*y + c*sqrt(y**2 + 1)
+so for fixed (m, sigma) the best (a, d, c) is a small constrained least squares problem, and only
+(m, sigma) needs a numerical search.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import os
+
+import numpy as np
+from scipy.optimize import minimize
+
+
+SIGMA_MIN, SIGMA_MAX = 1e-3, 2.0
+
+
+class CalibrationError(ValueError):
+    pass
+
+
+def svi(k, params):
+    # raw-SVI total variance, broadcasting k against the parameters
+    # (scalars for a single maturity, or (n_T, 1) columns for one slice per maturity)
+    a, b, rho, m, sigma = params
+    return a + b*(rho*(k - m) + np.sqrt((k - m)**2 + sigma**2))
+
+
+def constraints(sigma, w_max):
+    # G @ (a, d, c) <= h:  0 <= a <= max(w),  |d| <= c,  |d| <= 4*sigma - c
+    G = np.array([[-1.0,  0.0,  0.0],
+                  [ 1.0,  0.0,  0.0],
+                  [ 0.0,  1.0, -1.0],
+                  [ 0.0, -1.0, -1.0],
+                  [ 0.0,  1.0,  1.0],
+                  [ 0.0, -1.0,  1.0]])
+    h = np.array([0.0, w_max, 0.0, 0.0, 4*sigma, 4*sigma])
+    return G, h
+
+
+# every set of at most 3 active constraints, the optimum lies on (the interior of) one of these faces
+ACTIVE_SETS = [list(c) for n in range(1, 4) for c in combinations(range(6), n)]
+
+
+def inner_fit(k, w, m, sigma, weights=None):
+    # Best (a, d, c) for fixed (m, sigma) and its weighted squared error, (None, inf) if no
+    # feasible solve succeeds (e.g. NaN quotes or too few of them)
+    y = (k - m) / sigma
+    A = np.column_stack([np.ones_like(y), y, np.sqrt(y*y + 1)])
+    if weights is not None:
+        A, w = A * weights[:, None], w * weights
+    AtA, Atw = A.T @ A, A.T @ w
+    G, h = constraints(sigma, w.max() if weights is None else np.max(w / weights))
+
+    def error(x):
+        return float(x @ AtA @ x - 2 * x @ Atw + w @ w)
+
+    x = np.linalg.lstsq(AtA, Atw, rcond=None)[0]
+    if np.all(G @ x <= h + 1e-12):
+        return x, error(x)
+
+    # unconstrained optimum infeasible: best feasible optimum over the faces of the polytope
+    best_x, best_err = None, np.inf
+    for active in ACTIVE_SETS:
+        E, f = G[active], h[active]
+        n = len(active)
+        kkt = np.block([[AtA, E.T], [E, np.zeros((n, n))]])
+        try:
+            x = np.linalg.solve(kkt, np.concatenate([Atw, f]))[:3]
+        except np.linalg.LinAlgError:
+            continue
+        if np.all(G @ x <= h + 1e-12):
+            err = error(x)
+            if err < best_err:
+                best_x, best_err = x, err
+    return best_x, best_err
+
+
+def to_raw(x, m, sigma):
+    a, d, c = x
+    b = c / sigma
+    rho = d / c if c > 0 else 0.0
+    return np.array([a, b, rho, m, sigma])
+
+
+def calibrate_slice(k, w, weights=None, x0=None):
+    """Fits raw-SVI (a, b, rho, m, sigma) to the total variances w at log-moneyness k of one maturity."""
+    k, w = np.asarray(k, dtype=float), np.asarray(w, dtype=float)
+    m_bounds = (k.min() - 0.5, k.max() + 0.5)
+
+    def outer(z):
+        m, sigma = z
+        return inner_fit(k, w, m, sigma, weights)[1]
+
+    if x0 is None:
+        # cold start: coarse grid over (m, sigma)
+        grid = [(m, s) for m in np.linspace(k.min(), k.max(), 9) for s in np.geomspace(0.01, 1.0, 9)]
+        x0 = min(grid, key=outer)
+    else:
+        x0 = (np.clip(x0[0], *m_bounds), np.clip(x0[1], SIGMA_MIN, SIGMA_MAX))
+
+    res = minimize(outer, x0, method="Nelder-Mead", bounds=[m_bounds, (SIGMA_MIN, SIGMA_MAX)],
+                   options=dict(xatol=1e-8, fatol=1e-14, maxiter=2000))
+    m, sigma = res.x
+    x, err = inner_fit(k, w, m, sigma, weights)
+    if x is None:
+        raise CalibrationError(f"no feasible raw-SVI fit for the slice of {len(k)} quotes "
+                               f"with k in [{np.nanmin(k):.3g}, {np.nanmax(k):.3g}]")
+    return to_raw(x, m, sigma), np.sqrt(max(err, 0.0) / len(k))
+
+
+def calibrate_chain(slices, x0=None):
+    # Calibrates consecutive maturities in order, each one warm started from the previous fit
+    fits = []
+    for k, w, weights in slices:
+        params, rmse = calibrate_slice(k, w, weights, x0)
+        fits.append((params, rmse))
+        x0 = params[3:]
+    return fits
+
+
+def calibrate_surface(k, T, w, weights=None, n_workers=None):
+    """
+    Fits one raw-SVI slice per distinct maturity in the quotes (k, T, total variance w).
+
+    Maturities are split into contiguous chunks, one per worker process, and within a chunk every
+    slice is warm started from the neighbouring maturity's fit. Returns (maturities, params, rmse)
+    with params an (n_T, 5) array of (a, b, rho, m, sigma).
+    """
+    k, T, w = (np.asarray(v, dtype=float).ravel() for v in (k, T, w))
+    weights = None if weights is None else np.asarray(weights, dtype=float).ravel()
+    maturities, idx = np.unique(T, return_inverse=True)
+    slices = [(k[idx == i], w[idx == i], None if weights is None else weights[idx == i])
+              for i in range(len(maturities))]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(slices))
+    if n_workers <= 1:
+        fits = calibrate_chain(slices)
+    else:
+        chunks = [list(c) for c in np.array_split(np.arange(len(slices)), n_workers)]
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = pool.map(calibrate_chain, [[slices[i] for i in c] for c in chunks])
+            fits = [fit for chunk in results for fit in chunk]
+
+    params = np.array([p for p, _ in fits])
+    rmse = np.array([e for _, e in fits])
+    return maturities, params, rmse
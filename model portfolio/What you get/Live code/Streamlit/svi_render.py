@@ -0,0 +1,64 @@
+"""
+Lightweight rendering of large surfaces with Plotly.
+
+The meshgrid is decimated to a vertex budget, x and y go to the browser as 1-D float32 axes
+(Plotly serialises numpy arrays as typed binary buffers). For a given grid the figure (traces,
+axes and layout) is built once and kept in the view; between slider moves only the z arrays and
+the visibility of its traces are assigned, and a fixed `uirevision` lets Plotly update the traces
+in place instead of redrawing the scene. Streamlit itself still serialises the whole figure on
+every rerun: st.plotly_chart has no partial updates.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+
+def decimation_indices(n, n_out):
+    # n_out evenly spread indices of an axis of length n, always keeping both ends
+    if n_out >= n:
+        return np.arange(n)
+    return np.unique(np.round(np.linspace(0, n - 1, max(n_out, 2))).astype(int))
+
+
+class SurfaceView:
+    def __init__(self, x, y, max_vertices=40_000):
+        # x: columns (strikes), y: rows (maturities) of the z arrays
+        x, y = np.asarray(x), np.asarray(y)
+        scale = min(1.0, np.sqrt(max_vertices / (len(x) * len(y))))
+        n_rows = min(len(y), max(2, int(len(y) * scale)))
+        n_cols = min(len(x), max(2, max_vertices // n_rows))
+        self.rows = decimation_indices(len(y), n_rows)
+        self.cols = decimation_indices(len(x), n_cols)
+        self.x = x[self.cols].astype(np.float32)
+        self.y = y[self.rows].astype(np.float32)
+        self.key = (len(x), float(x[0]), float(x[-1]), len(y), float(y[0]), float(y[-1]), max_vertices)
+        self.fig = None
+        self.names = None
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.cols)
+
+    def z(self, Z):
+        return np.asarray(Z)[np.ix_(self.rows, self.cols)].astype(np.float32)
+
+    def surface(self, Z, **kwargs):
+        return go.Surface(z=self.z(Z), x=self.x, y=self.y, **kwargs)
+
+    def figure(self, traces, **layout):
+        """
+        `traces` maps a trace name to (Z, visible, style). The figure is built on the first call
+        (or when the set of traces changes) with `style` and `layout`; later calls only assign
+        each trace's decimated z and its visibility.
+        """
+        if self.fig is None or self.names != list(traces):
+            self.names = list(traces)
+            self.fig = go.Figure(
+                data=[self.surface(Z, name=name, visible=visible, **style)
+                      for name, (Z, visible, style) in traces.items()],
+                layout=go.Layout(uirevision=str(self.key), **layout))
+            return self.fig
+        with self.fig.batch_update():
+            for trace, (Z, visible, _) in zip(self.fig.data, traces.values()):
+                trace.z = self.z(Z)
+                trace.visible = visible
+        return self.fig